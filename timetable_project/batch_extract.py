@@ -0,0 +1,242 @@
+# Extract many timetable PDFs from the command line.
+#
+#   python batch_extract.py pdfs/ --out results.jsonl --workers 8
+#   python batch_extract.py --manifest files.txt --out results.jsonl --ics-dir ics/
+#
+# One JSON record per PDF is appended to --out as soon as it finishes:
+#   {"path", "status": "ok" | "error", "seconds", "n_entries", "entries", "error", "ics", "ics_errors", "trace"}
+# The output file doubles as the checkpoint: rerunning the same command skips PDFs
+# that already have a record (unless they changed on disk, or --retry-errors is
+# given for failed ones), so an interrupted run resumes where it stopped.
+# A worker that dies (e.g. out of memory) gets its pool restarted; the PDF that killed
+# it is recorded as an error and the rest of the batch carries on.
+# Extraction settings come from the usual TIMETABLE_* environment variables.
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from dataclasses import replace
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from scripts.utils.options import ExtractOptions
+
+
+def find_pdfs(inputs, manifest=None):
+    """
+    (absolute path, output name) for every PDF in the inputs and manifest. Output names
+    are paths relative to the folder all inputs share, so a/x.pdf and b/x.pdf keep
+    separate .ics/trace files; ValueError if two PDFs would still get the same name.
+    """
+    found = []  # (absolute path, folder it was found under)
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(".pdf"):
+                        found.append((os.path.abspath(os.path.join(root, name)), os.path.abspath(item)))
+        else:
+            found.append((os.path.abspath(item), os.path.dirname(os.path.abspath(item))))
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    found.append((os.path.abspath(line), os.path.dirname(os.path.abspath(line))))
+    seen = set()
+    found = [(path, base) for path, base in found if not (path in seen or seen.add(path))]
+    if not found:
+        return []
+
+    try:
+        common = os.path.commonpath([base for _, base in found])
+    except ValueError:  # different drives on Windows
+        common = None
+    pdfs, owners = [], {}
+    for path, base in found:
+        rel = os.path.relpath(path, common) if common else os.path.relpath(path, base)
+        if os.path.normcase(rel) in owners:
+            raise ValueError(f"{path} and {owners[os.path.normcase(rel)]} would both be written as {rel}")
+        owners[os.path.normcase(rel)] = path
+        pdfs.append((path, rel))
+    return pdfs
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_size, int(st.st_mtime)
+
+
+def load_checkpoint(out_path):
+    """
+    Records already written to `out_path`, by path. A partial last line left by an
+    interrupted write is cut off so new records start on a clean line.
+    """
+    done = {}
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logging.warning("Dropping incomplete last record in %s", out_path)
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        done[record["path"]] = record
+    return done
+
+
+def extract_one(path, rel, ics_dir, options, trace_dir=None):
+    """Worker: extract one PDF (through the result cache) and optionally write its .ics and trace."""
+    from scripts.extract_timetable import extract_timetable_cached
+    from scripts.utils.ics_writer import generate_ics_bytes
+    from scripts.utils import tracing
+
+    record = {"path": path}
+    t0 = time.perf_counter()
+    try:
+        record["size"], record["mtime"] = file_stamp(path)
+        with tracing.trace(options.trace or bool(trace_dir), memory=options.low_memory) as tracer:
+            entries = extract_timetable_cached(path, options)
+        record.update(status="ok", n_entries=len(entries), entries=entries)
+        if trace_dir:
+            trace_path = os.path.join(trace_dir, os.path.splitext(rel)[0] + ".trace.json")
+            os.makedirs(os.path.dirname(trace_path), exist_ok=True)
+            tracer.write_chrome_trace(trace_path)
+            record["trace"] = trace_path
+        if ics_dir:
+            ics_bytes, ics_errors = generate_ics_bytes(entries)
+            ics_path = os.path.join(ics_dir, os.path.splitext(rel)[0] + ".ics")
+            os.makedirs(os.path.dirname(ics_path), exist_ok=True)
+            with open(ics_path, "wb") as f:
+                f.write(ics_bytes)
+            record.update(ics=ics_path, ics_errors=ics_errors)
+    except Exception as e:
+        logging.exception("Failed to extract %s", path)
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - t0, 3)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract timetable PDFs in bulk")
+    parser.add_argument("inputs", nargs="*", help="PDF files or directories (searched recursively)")
+    parser.add_argument("--manifest", help="text file with one PDF path per line")
+    parser.add_argument("--out", required=True, help="JSONL output, also used as the resume checkpoint")
+    parser.add_argument("--ics-dir", help="also write one .ics per PDF here")
+    parser.add_argument("--trace-dir", help="write a Chrome trace of each extraction here")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--retry-errors", action="store_true", help="re-run PDFs whose last record is an error")
+    parser.add_argument("--warm-up", action="store_true", help="run one YOLO warm-up inference per worker")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.manifest:
+        parser.error("give PDF files/directories or --manifest")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Files are the unit of parallelism here, so each extraction runs its pages serially
+    options = replace(ExtractOptions.from_env(), workers=1)
+
+    try:
+        pdfs = find_pdfs(args.inputs, args.manifest)
+    except ValueError as e:
+        parser.error(str(e))
+    done = load_checkpoint(args.out)
+    todo = []
+    for path, rel in pdfs:
+        record = done.get(path)
+        if record is not None and os.path.exists(path) and (record.get("size"), record.get("mtime")) == file_stamp(path):
+            if record["status"] == "ok" or not args.retry_errors:
+                continue
+        todo.append((path, rel))
+    logging.info("%d PDF(s) found, %d already done, %d to extract with %d worker(s)",
+                 len(pdfs), len(pdfs) - len(todo), len(todo), args.workers)
+
+    counts = {"ok": 0, "error": 0}
+    t_start = time.perf_counter()
+    with open(args.out, "a", encoding="utf-8") as out:
+        def write(record):
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()  # every finished PDF survives an interruption
+            counts[record["status"]] += 1
+            logging.info("[%d/%d] %s %s in %.1fs", sum(counts.values()), len(todo),
+                         record["status"], record["path"], record["seconds"])
+
+        from scripts.extract_timetable import _init_worker
+        if args.workers <= 1:
+            _init_worker(args.warm_up)
+            for path, rel in todo:
+                write(extract_one(path, rel, args.ics_dir, options, args.trace_dir))
+        else:
+            def new_pool():
+                return ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_worker, initargs=(args.warm_up,))
+
+            pool = new_pool()
+            jobs, queue, suspects = {}, deque(todo), deque()  # future -> (path, rel, pool, ran alone)
+            try:
+                while True:
+                    # Keep a couple of jobs per worker in flight instead of submitting thousands up front.
+                    # Jobs that were in a pool when a worker died are rerun one at a time, so a crash
+                    # can be pinned on the PDF that caused it.
+                    while len(jobs) < 2 * args.workers:
+                        if suspects:
+                            if jobs:
+                                break
+                            (path, rel), alone = suspects.popleft(), True
+                        elif queue:
+                            (path, rel), alone = queue.popleft(), False
+                        else:
+                            break
+                        try:
+                            future = pool.submit(extract_one, path, rel, args.ics_dir, options, args.trace_dir)
+                        except BrokenProcessPool:
+                            (suspects if alone else queue).appendleft((path, rel))
+                            pool = new_pool()
+                            continue
+                        jobs[future] = (path, rel, pool, alone)
+                        if alone:
+                            break
+                    if not jobs:
+                        break
+                    finished, _ = wait(jobs, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        path, rel, job_pool, alone = jobs.pop(future)
+                        try:
+                            record = future.result()
+                        except BrokenProcessPool:
+                            # A worker died (out of memory, poppler crash, ...) and took every job in its pool down
+                            if job_pool is pool:
+                                logging.warning("Worker process died; restarting the pool")
+                                pool.shutdown(wait=False, cancel_futures=True)
+                                pool = new_pool()
+                            if not alone:
+                                suspects.append((path, rel))
+                                continue
+                            record = {"path": path, "status": "error", "seconds": 0.0,
+                                      "error": "BrokenProcessPool: the worker process died while extracting this PDF"}
+                        write(record)
+            except KeyboardInterrupt:
+                logging.warning("Interrupted; rerun the same command to resume")
+                pool.shutdown(wait=False, cancel_futures=True)
+                return 130
+            pool.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - t_start
+    logging.info("Done: %d ok, %d failed in %.1fs (%.2f PDF/s)", counts["ok"], counts["error"], elapsed,
+                 sum(counts.values()) / elapsed if elapsed else 0.0)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+
+# Standalone benchmark scripts. Run from timetable_project/, e.g.
+# python -m benchmarks.bench_layout_backends --pdf sample.pdf
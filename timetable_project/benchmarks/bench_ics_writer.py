@@ -0,0 +1,147 @@
+# benchmarks/bench_ics_writer.py
+#
+# Compare the streaming ICS writer with the previous `ics`-library export.
+#
+#   python -m benchmarks.bench_ics_writer --courses 100 1000 5000
+#
+# `legacy_ics` is the previous generate_ics_from_courses (ics.Event per week block,
+# pytz-localized, serialized through ics.Calendar). The `ics` package is no longer a
+# runtime dependency; install it to run the comparison. Both outputs are parsed back
+# and compared as (UTC start, UTC end, RRULE, summary, location, description) events.
+
+import time
+import random
+import argparse
+from datetime import datetime, date, timedelta
+
+import pytz
+
+from scripts.utils.constants import DAYS, WEEKS
+from scripts.utils.course_entry import CourseEntry
+from scripts.utils.ics_writer import generate_ics_bytes, split_weeks_into_blocks, get_week_index
+
+
+def legacy_ics(courses):
+    from ics import Calendar, Event
+    from ics.grammar.parse import ContentLine
+
+    cal = Calendar()
+    tz = pytz.timezone("Asia/Singapore")
+    errors = []
+    all_events = []
+    for idx, entry in enumerate(courses):
+        try:
+            raw_date = entry.get("startDate")
+            if isinstance(raw_date, str):
+                if raw_date.upper() == "UNKNOWN":
+                    raise ValueError("Missing startDate")
+                start_date = datetime.strptime(raw_date, "%d %b %y").date()
+            elif isinstance(raw_date, date):
+                start_date = raw_date
+            else:
+                raise ValueError("Invalid startDate type")
+
+            course = CourseEntry.from_dict(entry)
+            if not course.has_time:
+                raise ValueError(f"Invalid time '{entry.get('time', '')}'")
+            start_h, start_m = divmod(course.start, 60)
+            end_h, end_m = divmod(course.end, 60)
+
+            course_weeks = course.weeks
+            course_first_week_index = get_week_index(course_weeks[0])
+            for block in split_weeks_into_blocks(course_weeks):
+                week_diff = get_week_index(block[0]) - course_first_week_index
+                session_date = start_date + timedelta(weeks=week_diff)
+                day = (session_date.year, session_date.month, session_date.day)
+
+                e = Event()
+                e.name = f"{entry['courseCode']} ({entry['group']})"
+                e.location = entry["location"]
+                e.begin = tz.localize(datetime(*day, start_h, start_m))
+                e.end = tz.localize(datetime(*day, end_h, end_m))
+                e.description = f"Weeks: {', '.join(block)}"
+                if entry.get("note"):
+                    e.description += f"\nNote: {entry['note']}"
+                e.extra.append(ContentLine(name="RRULE", value=f"FREQ=WEEKLY;COUNT={len(block)}"))
+                all_events.append(e)
+        except Exception as e:
+            errors.append(f"Error in Course {idx + 1}: {e}")
+
+    all_events.sort(key=lambda e: (e.begin.datetime, e.name))
+    for e in all_events:
+        cal.events.add(e)
+    return "".join(cal).encode("utf-8"), errors
+
+
+def parse_events(data):
+    """Minimal RFC 5545 reader: unfold, then normalize each VEVENT to comparable values."""
+    text = data.decode("utf-8").replace("\r\n ", "").replace("\r\n\t", "")
+    unescape = lambda v: v.replace("\\n", "\n").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+    events, current = [], None
+    for line in text.split("\r\n"):
+        if line == "BEGIN:VEVENT":
+            current = {}
+        elif line == "END:VEVENT":
+            events.append((current["DTSTART"], current["DTEND"], current["RRULE"], current["SUMMARY"],
+                           current.get("LOCATION", ""), current.get("DESCRIPTION", "")))
+            current = None
+        elif current is not None:
+            name, _, value = line.partition(":")
+            name, _, params = name.partition(";")
+            if name in ("DTSTART", "DTEND"):
+                if value.endswith("Z"):
+                    value = pytz.utc.localize(datetime.strptime(value, "%Y%m%dT%H%M%SZ"))
+                else:
+                    tz = pytz.timezone(params.split("=", 1)[1])
+                    value = tz.localize(datetime.strptime(value, "%Y%m%dT%H%M%S")).astimezone(pytz.utc)
+            elif name in ("SUMMARY", "LOCATION", "DESCRIPTION"):
+                value = unescape(value)
+            current[name] = value
+    return sorted(events)
+
+
+def synthetic_courses(n, seed=0):
+    rng = random.Random(seed)
+    courses = []
+    for _ in range(n):
+        start = 510 + 30 * rng.randint(0, 24)
+        end = start + 30 * rng.randint(1, 4)
+        weeks = sorted(rng.sample(range(len(WEEKS)), rng.randint(1, 14)))
+        courses.append({
+            "courseCode": rng.choice(["EG1001", "SC1003", "MH1100", "CZ2002"]),
+            "group": rng.choice(["G1", "T3", "LEC/STUDIO"]),
+            "location": rng.choice(["TR+92", "LT2, North Spine", "LKC-1; Hall"]),
+            "weeks": [WEEKS[i] for i in weeks],
+            "time": f"{start // 60:02d}{start % 60:02d}-{end // 60:02d}{end % 60:02d}",
+            "day": rng.choice(DAYS),
+            "startDate": (date(2025, 8, 11) + timedelta(days=rng.randint(0, 4))).strftime("%d %b %y"),
+            "note": rng.choice(["", "", "DEEPAVALI", "National Day — no class"]),
+        })
+    return courses
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark ICS export")
+    ap.add_argument("--courses", nargs="+", type=int, default=[100, 1000, 5000])
+    args = ap.parse_args()
+
+    print(f"{'courses':>8}{'events':>8}{'ics lib ms':>12}{'writer ms':>12}{'speedup':>10}")
+    for n in args.courses:
+        courses = synthetic_courses(n)
+
+        t0 = time.perf_counter()
+        old, old_errors = legacy_ics(courses)
+        t_old = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        new, new_errors = generate_ics_bytes(courses)
+        t_new = time.perf_counter() - t0
+
+        old_events, new_events = parse_events(old), parse_events(new)
+        assert old_errors == new_errors, "error lists differ"
+        assert old_events == new_events, "events differ"
+        print(f"{n:>8}{len(new_events):>8}{t_old * 1000:>12.1f}{t_new * 1000:>12.1f}{t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
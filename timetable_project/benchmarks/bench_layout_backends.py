@@ -0,0 +1,80 @@
+# benchmarks/bench_layout_backends.py
+#
+# Compare layout-detection latency and box agreement across inference backends.
+#
+#   python -m benchmarks.bench_layout_backends --pdf a.pdf b.pdf --backends torch onnx openvino
+#
+# The first backend is the reference: for every page and class, the top box of each
+# other backend is compared with the reference box by IoU (the pipeline only ever
+# uses the first box of each class).
+
+import os
+import time
+import argparse
+import statistics
+
+from scripts.layout_detector import LAYOUT_BACKENDS, LAYOUT_IMGSZ, get_layout_model, run_yolo_detection
+from scripts.utils.page_source import PdfPageSource
+
+
+def iou(a, b):
+    ix = max(0.0, min(a["x2"], b["x2"]) - max(a["x1"], b["x1"]))
+    iy = max(0.0, min(a["y2"], b["y2"]) - max(a["y1"], b["y1"]))
+    inter = ix * iy
+    union = (a["x2"] - a["x1"]) * (a["y2"] - a["y1"]) + (b["x2"] - b["x1"]) * (b["y2"] - b["y1"]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def top_boxes(box_df):
+    return {int(cls): grp.iloc[0] for cls, grp in box_df.groupby("class", sort=False)}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark layout inference backends")
+    ap.add_argument("--pdf", nargs="+", required=True, help="timetable PDFs to take pages from")
+    ap.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino", "openvino_int8"])
+    ap.add_argument("--imgsz", type=int, default=LAYOUT_IMGSZ)
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per page")
+    args = ap.parse_args()
+
+    backends = [b for b in args.backends if os.path.exists(LAYOUT_BACKENDS[b])]
+    for b in set(args.backends) - set(backends):
+        print(f"⚠️  skipping {b}: {LAYOUT_BACKENDS[b]} not found (run yolov8/export_model.py)")
+    if not backends:
+        return
+
+    pages = [p.image for pdf in args.pdf for p in PdfPageSource(pdf, last_page=5)]
+    print(f"{len(pages)} page(s), imgsz={args.imgsz}\n")
+
+    detections = {}
+    print(f"{'backend':<15}{'load s':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for backend in backends:
+        manager = get_layout_model(backend)
+        manager.warm_up((args.imgsz, args.imgsz))
+        timings, detections[backend] = [], []
+        for image in pages:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                box_df = run_yolo_detection(image, backend=backend, imgsz=args.imgsz)
+                timings.append((time.perf_counter() - t0) * 1000)
+            detections[backend].append(top_boxes(box_df))
+        print(f"{backend:<15}{manager.load_seconds:>8.2f}{statistics.mean(timings):>10.1f}"
+              f"{percentile(timings, 0.5):>10.1f}{percentile(timings, 0.95):>10.1f}")
+
+    reference = backends[0]
+    print(f"\nBox agreement vs {reference} (mean IoU of top box per class, missing classes count as 0)")
+    for backend in backends[1:]:
+        scores = []
+        for ref, other in zip(detections[reference], detections[backend]):
+            for cls, ref_box in ref.items():
+                scores.append(iou(ref_box, other[cls]) if cls in other else 0.0)
+        print(f"  {backend:<15}{statistics.mean(scores) if scores else float('nan'):.3f}")
+
+
+if __name__ == "__main__":
+    main()
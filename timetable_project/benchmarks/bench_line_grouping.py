@@ -0,0 +1,60 @@
+# benchmarks/bench_line_grouping.py
+#
+# Check that group_lines_1d reproduces DBSCAN(eps, min_samples=1) labels on 1-D
+# coordinates, and time both.
+#
+#   python -m benchmarks.bench_line_grouping
+#
+# scikit-learn is no longer a runtime dependency; install it to run the comparison.
+# tests/test_line_grouping.py checks the DBSCAN-equivalent labels without it.
+
+import time
+import random
+import argparse
+
+import numpy as np
+
+from scripts.utils.line_grouping import group_lines_1d
+
+
+def random_column(rng, n):
+    """yc values of a week column: a few text lines with jitter, plus some exact ties."""
+    lines = sorted(rng.uniform(0, 3000) for _ in range(max(1, n // 3)))
+    values = [rng.choice(lines) + rng.uniform(-6, 6) for _ in range(n)]
+    values += [values[0]] * (n // 10)
+    rng.shuffle(values)
+    return np.array(values)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare 1-D line grouping with DBSCAN")
+    ap.add_argument("--cases", type=int, default=2000)
+    ap.add_argument("--eps", type=float, default=20)
+    args = ap.parse_args()
+
+    from sklearn.cluster import DBSCAN
+
+    rng = random.Random(0)
+    cases = [random_column(rng, rng.randint(1, 60)) for _ in range(args.cases)]
+    # Integer coordinates hit the eps boundary exactly, like Tesseract boxes do
+    cases += [np.array([0, 20, 40, 61, 81, 200, 220], dtype=float), np.array([5.0])]
+
+    t0 = time.perf_counter()
+    expected = [DBSCAN(eps=args.eps, min_samples=1).fit(v.reshape(-1, 1)).labels_ for v in cases]
+    t_dbscan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = [group_lines_1d(v, gap=args.eps) for v in cases]
+    t_group = time.perf_counter() - t0
+
+    mismatches = sum(not np.array_equal(a, b) for a, b in zip(expected, got))
+    print(f"{len(cases)} columns, {mismatches} label mismatches")
+    print(f"DBSCAN:          {t_dbscan * 1e6 / len(cases):8.1f} us/column")
+    print(f"group_lines_1d:  {t_group * 1e6 / len(cases):8.1f} us/column "
+          f"({t_dbscan / t_group:.0f}x faster)")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_merge_entries.py
+#
+# Scaling benchmark for merge_entries on synthetic course entries.
+#
+#   python -m benchmarks.bench_merge_entries --sizes 10 100 1000 10000 100000
+#
+# `legacy_merge` is the previous pairwise O(n²) implementation. It only runs up to
+# --legacy-max entries, and wherever it runs the two outputs must be identical.
+
+import time
+import random
+import argparse
+
+from scripts.extract_timetable import merge_entries, merge_group, time_overlap
+from scripts.utils.course_entry import CourseEntry
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+CODES = ["EG1001", "EG 1001", "SC1003", "MH1100", "MH1100 (LEC)", "CZ2002"]
+
+
+def legacy_merge(entries):
+    merged = []
+    used = [False] * len(entries)
+    for i, e1 in enumerate(entries):
+        if used[i]:
+            continue
+        group = [e1]
+        used[i] = True
+        for j in range(i + 1, len(entries)):
+            e2 = entries[j]
+            if used[j]:
+                continue
+            if e1["day"] == e2["day"] and time_overlap(e1["time"], e2["time"]):
+                group.append(e2)
+                used[j] = True
+        merged.append(merge_group([CourseEntry.from_dict(e) for e in group]).to_dict())
+    return merged
+
+
+def hhmm(minutes):
+    return f"{minutes // 60:02d}{minutes % 60:02d}"
+
+
+def synthetic_entries(n, seed=0):
+    """Per-week-column entries like extract_courses emits, spread over a long staff timetable."""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(n):
+        start = 510 + 30 * rng.randint(0, 26)
+        end = min(start + 30 * rng.randint(1, 6), 1350)
+        entries.append({
+            "courseCode": rng.choice(CODES),
+            "group": rng.choice(["G1", "G2", "T3"]),
+            "location": rng.choice(["TR+92", "LT2", "LKC-1"]),
+            "weeks": [str(rng.randint(1, 13))],
+            "time": f"{hhmm(start)}-{hhmm(end)}",
+            "day": rng.choice(DAYS),
+            "startDate": "",
+            "note": rng.choice(["", "", "", "DEEPAVALI"]),
+        })
+    return entries
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark merge_entries scaling")
+    ap.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000, 100000])
+    ap.add_argument("--legacy-max", type=int, default=10000)
+    args = ap.parse_args()
+
+    print(f"{'entries':>8}{'merged':>8}{'legacy ms':>12}{'current ms':>12}{'speedup':>10}")
+    for n in args.sizes:
+        entries = synthetic_entries(n)
+        items = [CourseEntry.from_dict(e) for e in entries]  # what extract_courses emits
+
+        t0 = time.perf_counter()
+        result = merge_entries(items)
+        t_new = time.perf_counter() - t0
+
+        if n <= args.legacy_max:
+            t0 = time.perf_counter()
+            expected = legacy_merge(entries)
+            t_old = time.perf_counter() - t0
+            assert result == expected, f"merge results differ for {n} entries"
+            legacy_col, speedup = f"{t_old * 1000:>12.1f}", f"{t_old / t_new:>9.1f}x"
+        else:
+            legacy_col, speedup = f"{'-':>12}", f"{'-':>10}"
+        print(f"{n:>8}{len(result):>8}{legacy_col}{t_new * 1000:>12.1f}{speedup}")
+
+
+if __name__ == "__main__":
+    main()
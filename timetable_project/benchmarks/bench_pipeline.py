@@ -0,0 +1,256 @@
+# benchmarks/bench_pipeline.py
+#
+# End-to-end benchmark of extract_timetable on synthetic timetables with ground truth.
+#
+#   python -m benchmarks.bench_pipeline --count 10 --density 6
+#   python -m benchmarks.bench_pipeline --dir synthetic/ --report report.json
+#
+# Renders --count timetables with benchmarks.synthetic_timetable (or reuses the
+# .pdf/.json pairs in --dir), extracts each one and reports:
+#   - per-stage latency from scripts/utils/tracing.py spans (rasterize, OCR, YOLO, ...)
+#     and counters such as Tesseract calls and OCR crops
+#   - throughput in pages per second and per-PDF latency percentiles
+#   - peak memory: process max RSS, the traced Python/numpy heap with --tracemalloc,
+#     and peak RSS per stage when TIMETABLE_LOW_MEMORY=1
+#   - field-level accuracy against the ground truth
+# The result cache and layout cache are off unless --keep-caches is given, so every
+# run does the full work. Spans nest (a "page" span contains its OCR, YOLO, ...), so
+# shares are relative to the whole extraction rather than adding up to 100%.
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from collections import defaultdict
+from dataclasses import replace
+
+from benchmarks.synthetic_timetable import generate_set
+from scripts.utils.course_entry import parse_time_range
+from scripts.utils import tracing
+
+FIELDS = ["courseCode", "group", "location", "weeks", "time", "startDate", "note"]
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+# === Accuracy ===
+def _overlap(t1, t2):
+    s1, e1 = parse_time_range(t1)
+    s2, e2 = parse_time_range(t2)
+    return s1 is not None and s2 is not None and s1 < e2 and s2 < e1
+
+
+def _field_equal(field, truth, pred):
+    if field == "weeks":
+        return list(truth.get("weeks", [])) == list(pred.get("weeks", []))
+    return str(truth.get(field, "")).strip() == str(pred.get(field, "")).strip()
+
+
+def match_entries(truth, predicted):
+    """
+    Pair each ground-truth entry with at most one predicted entry on the same day with
+    an overlapping time, preferring the candidate that gets the most fields right.
+    Returns [(truth entry, predicted entry or None)] and the unmatched predictions.
+    """
+    candidates = []
+    for i, t in enumerate(truth):
+        for j, p in enumerate(predicted):
+            if p.get("day") == t.get("day") and _overlap(t.get("time", ""), p.get("time", "")):
+                score = sum(_field_equal(f, t, p) for f in FIELDS)
+                candidates.append((-score, i, j))
+    candidates.sort()
+
+    pairs, used_t, used_p = {}, set(), set()
+    for _, i, j in candidates:
+        if i not in used_t and j not in used_p:
+            pairs[i] = j
+            used_t.add(i)
+            used_p.add(j)
+    matched = [(t, predicted[pairs[i]] if i in pairs else None) for i, t in enumerate(truth)]
+    extra = [p for j, p in enumerate(predicted) if j not in used_p]
+    return matched, extra
+
+
+def score_entries(truth, predicted):
+    """Counts for one PDF: per-field correct, exact entries, matched and extra predictions."""
+    matched, extra = match_entries(truth, predicted)
+    counts = {"truth": len(truth), "predicted": len(predicted), "matched": 0, "exact": 0, "extra": len(extra),
+              "fields": dict.fromkeys(FIELDS, 0)}
+    for t, p in matched:
+        if p is None:
+            continue
+        counts["matched"] += 1
+        correct = [f for f in FIELDS if _field_equal(f, t, p)]
+        for f in correct:
+            counts["fields"][f] += 1
+        counts["exact"] += len(correct) == len(FIELDS)
+    return counts
+
+
+def add_counts(total, counts):
+    for key, value in counts.items():
+        if key == "fields":
+            for f, n in value.items():
+                total["fields"][f] = total["fields"].get(f, 0) + n
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def load_pairs(directory):
+    pairs = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                truth = json.load(f)
+            pairs.append((os.path.join(directory, truth["pdf"]), truth))
+    return pairs
+
+
+def main():
+    ap = argparse.ArgumentParser(description="End-to-end timetable extraction benchmark")
+    ap.add_argument("--dir", help="reuse .pdf/.json pairs from this directory instead of generating")
+    ap.add_argument("--count", type=int, default=5, help="timetables to generate")
+    ap.add_argument("--density", type=float, default=6, help="courses per day on average")
+    ap.add_argument("--holidays", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1, help=">1 uses the page process pool")
+    ap.add_argument("--warmup", type=int, default=1, help="untimed extractions first (model load, caches)")
+    ap.add_argument("--keep-caches", action="store_true", help="leave the layout/result caches as configured")
+    ap.add_argument("--tracemalloc", action="store_true", help="also trace the Python heap peak (slower)")
+    ap.add_argument("--report", help="write the full report as JSON here")
+    args = ap.parse_args()
+
+    import scripts.extract_timetable as pipeline
+    from scripts.utils.ocr_engine import set_ocr_backend
+    from scripts.utils.options import ExtractOptions
+
+    options = ExtractOptions.from_env(workers=args.workers)
+    if not args.keep_caches:
+        options = replace(options, layout_cache=False, result_cache=False)
+    set_ocr_backend(options.ocr_backend)
+
+    tmp = None
+    if args.dir:
+        pairs = load_pairs(args.dir)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="timetable_bench_")
+        generated = generate_set(tmp.name, args.count, args.density, args.holidays, args.seed)
+        pairs = load_pairs(tmp.name)
+        print(f"Generated {len(generated)} synthetic timetable(s) in {tmp.name}")
+    if not pairs:
+        sys.exit("no timetables to benchmark")
+
+    for pdf_path, _ in pairs[:args.warmup]:
+        pipeline.extract_timetable(pdf_path, options)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = max_rss_mb()
+
+    stage_totals, stage_calls, counter_totals = defaultdict(float), defaultdict(int), defaultdict(int)
+    stage_peaks = defaultdict(float)
+    latencies, total_pages = [], 0
+    accuracy = {"fields": {}}
+    per_pdf = []
+    for pdf_path, truth in pairs:
+        tracer = tracing.Tracer(memory=options.low_memory)
+        t0 = time.perf_counter()
+        with tracing.activate(tracer):
+            predicted = pipeline.extract_timetable(pdf_path, options)
+        elapsed = time.perf_counter() - t0
+        tracer.close()
+        stages = tracer.summary()
+        for stage, s in stages.items():
+            stage_totals[stage] += s["seconds"]
+            stage_calls[stage] += s["calls"]
+            if "peak_mb" in s:
+                stage_peaks[stage] = max(stage_peaks[stage], s["peak_mb"])
+        for name, n in tracer.counters.items():
+            counter_totals[name] += n
+
+        counts = score_entries(truth["entries"], predicted)
+        add_counts(accuracy, counts)
+        latencies.append(elapsed)
+        total_pages += truth["pages"]
+        per_pdf.append({"pdf": os.path.basename(pdf_path), "seconds": round(elapsed, 3),
+                        "stages": {k: round(s["seconds"], 4) for k, s in stages.items()},
+                        "counters": dict(tracer.counters), **counts})
+        print(f"{os.path.basename(pdf_path):<24}{elapsed:>8.2f}s  entries {counts['predicted']:>3}/{counts['truth']:<3}"
+              f"  exact {counts['exact']:>3}")
+
+    traced_peak = None
+    if args.tracemalloc:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    rss_peak = max_rss_mb()
+
+    total_seconds = sum(latencies)
+    print(f"\n{'stage':<18}{'calls':>7}{'total s':>10}{'per page ms':>14}{'share':>8}"
+          + (f"{'peak MB':>10}" if stage_peaks else ""))
+    for stage, seconds in sorted(stage_totals.items(), key=lambda kv: -kv[1]):
+        print(f"{stage:<18}{stage_calls[stage]:>7}{seconds:>10.2f}{seconds / total_pages * 1000:>14.1f}"
+              f"{seconds / total_seconds:>8.1%}" + (f"{stage_peaks.get(stage, 0):>10.1f}" if stage_peaks else ""))
+    if counter_totals:
+        print("Counters per page: " + ", ".join(f"{name} {n / total_pages:.1f}"
+                                                for name, n in sorted(counter_totals.items())))
+
+    print(f"\n{len(latencies)} PDF(s), {total_pages} page(s) in {total_seconds:.2f}s: "
+          f"{total_pages / total_seconds:.2f} pages/s, PDF latency p50 {percentile(latencies, 50):.2f}s "
+          f"p95 {percentile(latencies, 95):.2f}s")
+    print(f"Peak RSS {rss_peak:.0f} MB (was {rss_before:.0f} MB after warm-up)"
+          + (f", traced heap peak {traced_peak:.0f} MB" if traced_peak is not None else ""))
+
+    n_truth = accuracy.get("truth", 0) or 1
+    n_pred = accuracy.get("predicted", 0) or 1
+    print(f"\nEntries: recall {accuracy.get('matched', 0) / n_truth:.1%}, precision {accuracy.get('matched', 0) / n_pred:.1%}, "
+          f"exact {accuracy.get('exact', 0) / n_truth:.1%}")
+    for f in FIELDS:
+        print(f"  {f:<12}{accuracy['fields'].get(f, 0) / n_truth:>8.1%}")
+
+    if args.report:
+        report = {
+            "options": options.__dict__,
+            "pdfs": len(latencies), "pages": total_pages, "seconds": round(total_seconds, 3),
+            "pages_per_second": round(total_pages / total_seconds, 3),
+            "latency_p50": round(percentile(latencies, 50), 3), "latency_p95": round(percentile(latencies, 95), 3),
+            "stages": {k: round(v, 4) for k, v in stage_totals.items()},
+            "counters": dict(counter_totals),
+            "stage_peak_rss_mb": dict(stage_peaks),
+            "peak_rss_mb": round(rss_peak, 1), "traced_peak_mb": traced_peak and round(traced_peak, 1),
+            "accuracy": {
+                "recall": accuracy.get("matched", 0) / n_truth,
+                "precision": accuracy.get("matched", 0) / n_pred,
+                "exact": accuracy.get("exact", 0) / n_truth,
+                "fields": {f: accuracy["fields"].get(f, 0) / n_truth for f in FIELDS},
+            },
+            "per_pdf": per_pdf,
+        }
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_refine_layout.py
+#
+# Micro-benchmark for refine_yolo_boxes_with_fallback on synthetic OCR tables.
+#
+#   python -m benchmarks.bench_refine_layout --tokens 500 2000 5000
+#
+# `legacy_refine` is the previous row-by-row implementation (iterrows grouping,
+# per-call line joins, one fuzzy call per token and variant). It is kept here only
+# as the baseline, and the two results are checked for equality on every run.
+
+import time
+import random
+import argparse
+
+import pandas as pd
+from rapidfuzz import fuzz
+
+from scripts.layout_detector import refine_yolo_boxes_with_fallback
+from scripts.utils.ocr_utils import clean_text
+
+
+def legacy_refine(box_df, ocr_df, ocr_line_gap=10):
+    refined = {}
+    ocr_df_sorted = ocr_df.sort_values("y1")
+    grouped_lines, current_line, last_y = [], [], None
+    for _, row in ocr_df_sorted.iterrows():
+        if last_y is None or abs(row["y1"] - last_y) <= ocr_line_gap:
+            current_line.append(row)
+        else:
+            grouped_lines.append(current_line)
+            current_line = [row]
+        last_y = row["y1"]
+    if current_line:
+        grouped_lines.append(current_line)
+
+    def find_line_pair(start_str, end_str):
+        for i in range(len(grouped_lines) - 1):
+            line1 = " ".join(clean_text(w["text"]) for w in grouped_lines[i])
+            line2 = " ".join(clean_text(w["text"]) for w in grouped_lines[i + 1])
+            if start_str in line1 and end_str in line2:
+                return min(w["y1"] for w in grouped_lines[i]), max(w["y2"] for w in grouped_lines[i + 1])
+        return None, None
+
+    wk = box_df[box_df["class"] == 1].iloc[0].copy()
+    for _, row in ocr_df.iterrows():
+        txt = clean_text(row["text"])
+        if any(fuzz.partial_ratio(txt, key) > 80 for key in ["WEEK", "VEEK", "EEK", "EKS"]):
+            if row["x1"] < wk["x1"]:
+                wk["x1"] = row["x1"] - 30
+        if "13" in txt and row["x2"] > wk["x2"]:
+            wk["x2"] = row["x2"] + 60
+    refined[1] = wk
+
+    ts = box_df[box_df["class"] == 0].iloc[0].copy()
+    x_shift = wk["x1"] - ts["x1"]
+    ts["x1"] += x_shift
+    ts["x2"] = ts["x1"] + (wk["x2"] - wk["x1"]) / 15 - 30
+    y1_pair = find_line_pair("0830", "0900")
+    y2_pair = find_line_pair("2200", "2230")
+    if y1_pair[0] is not None:
+        ts["y1"] = y1_pair[0] - 15
+    if y2_pair[1] is not None:
+        ts["y2"] = y2_pair[1] + 15
+    refined[0] = ts
+    return refined
+
+
+def synthetic_page(n_tokens, seed=0):
+    """A timetable-like token table: time labels down the left, words spread over the grid."""
+    rng = random.Random(seed)
+    rows = [{"text": "Week", "x1": 140, "y1": 330}, {"text": "13", "x1": 2290, "y1": 330}]
+    for i in range(29):
+        hhmm = f"{8 + (30 + 30 * i) // 60:02d}{(30 + 30 * i) % 60:02d}"
+        rows.append({"text": hhmm, "x1": 150, "y1": 500 + 100 * i})
+    vocab = ["EG1001", "E042", "TR+92", "LT2", "DEEPAVALI", "LKC-1", "G1", "SC1003", "Aug", "23"]
+    while len(rows) < n_tokens:
+        rows.append({"text": rng.choice(vocab), "x1": rng.randint(300, 2300), "y1": rng.randint(300, 3400)})
+    df = pd.DataFrame(rows)
+    df["conf"] = 90
+    df["width"], df["height"] = 60, 22
+    df["x2"] = df["x1"] + df["width"]
+    df["y2"] = df["y1"] + df["height"]
+    df["xc"] = (df["x1"] + df["x2"]) / 2
+    df["yc"] = (df["y1"] + df["y2"]) / 2
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark layout refinement")
+    ap.add_argument("--tokens", nargs="+", type=int, default=[250, 1000, 2500, 5000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    box_df = pd.DataFrame([
+        {"class": 0, "x1": 120.0, "x2": 260.0, "y1": 480.0, "y2": 3400.0},
+        {"class": 1, "x1": 160.0, "x2": 2300.0, "y1": 300.0, "y2": 380.0},
+        {"class": 2, "x1": 260.0, "x2": 2300.0, "y1": 480.0, "y2": 3400.0},
+    ])
+
+    print(f"{'tokens':>8}{'legacy ms':>12}{'current ms':>12}{'speedup':>10}")
+    for n in args.tokens:
+        ocr_df = synthetic_page(n)
+        timings = {}
+        for name, fn in (("legacy", legacy_refine), ("current", refine_yolo_boxes_with_fallback)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                result = fn(box_df, ocr_df)
+                best = min(best, time.perf_counter() - t0)
+            timings[name] = (best * 1000, result)
+        old, new = timings["legacy"][1], timings["current"][1]
+        assert all(dict(old[k]) == dict(new[k]) for k in (0, 1)), "refinement results differ"
+        print(f"{n:>8}{timings['legacy'][0]:>12.1f}{timings['current'][0]:>12.1f}"
+              f"{timings['legacy'][0] / timings['current'][0]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# benchmarks/synthetic_timetable.py
+#
+# Render synthetic timetable PDFs with ground-truth JSON, laid out like the real
+# export (see pipeline_rules.md and images/timetable_layout.png):
+#   grey day title bar, 15-column week header (Week, 1-7, Recess, 8-13) with two
+#   date lines per week, 28 half-hour rows 0830-2230, cyan 3-line course blocks,
+#   yellow holiday blocks and a grey Recess column. One page per day, Monday-Friday.
+#
+#   python -m benchmarks.synthetic_timetable --out synthetic/ --count 10 --density 6 --holidays 2
+#
+# Writes <name>.pdf and <name>.json per timetable. The JSON "entries" are what
+# extract_timetable should return: one merged entry per course and day, with weeks in
+# calendar order, the first week's date as startDate and "<HOLIDAY> on Week X" notes
+# for courses that sit directly under a holiday block in that week's column.
+
+import os
+import json
+import random
+import argparse
+from datetime import date, timedelta
+
+from PIL import Image, ImageDraw, ImageFont
+
+from scripts.utils.constants import DAYS, WEEKS, KNOWN_HOLIDAYS, IMAGE_SIZE
+
+DPI = 300
+N_ROWS = 28
+TEACHING_WEEKS = [w for w in WEEKS if w != "Recess"]
+
+# Page geometry (pixels at 300 DPI on A4). The header and every week column share
+# one width, since the pipeline splits the week box into 15 equal columns.
+LEFT, COL_W = 150, 150
+TITLE_Y, WEEK_Y, DATE_Y, GRID_Y = 170, 215, 262, 360
+ROW_H = 105
+RIGHT = LEFT + 15 * COL_W
+GRID_BOTTOM = GRID_Y + N_ROWS * ROW_H
+
+CYAN = (0, 176, 240)
+YELLOW = (255, 253, 204)
+HOLIDAY_BLUE = (0, 112, 192)
+GREY = (166, 166, 166)
+RECESS_GREY = (230, 230, 230)
+LINE_GREY = (64, 64, 64)
+
+FONT_PATHS = ["DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "arial.ttf", "calibri.ttf"]
+
+CODE_PREFIXES = ["EG", "MH", "CZ", "EE", "MA", "HW", "BU", "CB", "ME", "AB"]
+GROUP_PATTERNS = ["EPT{}", "T{}", "LE{}", "E0{}", "LAB{}", "P{}"]
+LOCATIONS = ["TR+{}", "LT{}", "LKC-{}", "TR+{}A", "LT{}A", "N{}-B2C"]
+WEEK_PATTERNS = [
+    TEACHING_WEEKS,                    # every teaching week
+    TEACHING_WEEKS[1:],                # from week 2 (tutorials)
+    [w for w in TEACHING_WEEKS if int(w) % 2 == 1],
+    [w for w in TEACHING_WEEKS if int(w) % 2 == 0],
+    TEACHING_WEEKS[:7],
+    TEACHING_WEEKS[7:],
+]
+DURATIONS = [2, 2, 2, 3, 4, 1]  # rows of 30 min
+
+
+def load_font(size):
+    for path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def row_label(row):
+    start = 8 * 60 + 30 + 30 * row
+    return f"{start // 60:02d}{start % 60:02d}", f"{(start + 30) // 60:02d}{(start + 30) % 60:02d}"
+
+
+def week_dates(semester_start):
+    """Week label -> (Monday, Friday) of that week."""
+    return {w: (semester_start + timedelta(weeks=i), semester_start + timedelta(weeks=i, days=4))
+            for i, w in enumerate(WEEKS)}
+
+
+def column_x(week):
+    """(x1, x2) of a week column; column 0 is the Week/Time column."""
+    col = WEEKS.index(week) + 1
+    return LEFT + col * COL_W, LEFT + (col + 1) * COL_W
+
+
+def row_y(row):
+    return GRID_Y + row * ROW_H
+
+
+def wrap(draw, text, font, width, max_lines=2):
+    """Greedy word wrap into at most `max_lines` lines."""
+    lines = []
+    for word in text.split():
+        if lines and draw.textlength(f"{lines[-1]} {word}", font=font) <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        elif len(lines) < max_lines:
+            lines.append(word)
+        else:
+            lines[-1] = f"{lines[-1]} {word}"
+    return lines
+
+
+def draw_centered(draw, lines, font, box, fill, line_height):
+    x1, y1, x2, y2 = box
+    top = (y1 + y2) / 2 - line_height * len(lines) / 2
+    for k, line in enumerate(lines):
+        draw.text(((x1 + x2) / 2, top + line_height * (k + 0.5)), line, font=font, fill=fill, anchor="mm")
+
+
+# === Timetable content ===
+def random_course(rng, used_codes):
+    while True:
+        code = f"{rng.choice(CODE_PREFIXES)}{rng.randint(1, 4)}{rng.randint(0, 9)}{rng.randint(0, 9)}{rng.randint(1, 9)}"
+        if code not in used_codes:
+            used_codes.add(code)
+            break
+    return {
+        "courseCode": code,
+        "group": rng.choice(GROUP_PATTERNS).format(rng.randint(1, 9)),
+        "location": rng.choice(LOCATIONS).format(rng.randint(1, 99)),
+        "weeks": list(rng.choice(WEEK_PATTERNS)),
+    }
+
+
+def generate_timetable(rng, density=6, holidays=2, semester_start=date(2022, 8, 8)):
+    """
+    Random timetable: per day, a list of course blocks (non-overlapping in time, as
+    in a student's own timetable) and holiday blocks. `density` is the number of
+    courses per day on average; `holidays` the number of holiday blocks in total.
+    """
+    used_codes = set()
+    days = {day: {"courses": [], "holidays": []} for day in DAYS}
+
+    # Holidays first: one column over a few hours, somewhere in the teaching weeks
+    holiday_names = [h.upper() for h in KNOWN_HOLIDAYS]
+    for _ in range(holidays):
+        day = rng.choice(DAYS)
+        week = rng.choice(TEACHING_WEEKS)
+        if any(h["week"] == week for h in days[day]["holidays"]):
+            continue
+        start = rng.randint(0, 8)
+        days[day]["holidays"].append({"name": rng.choice(holiday_names), "week": week,
+                                      "row": start, "rows": rng.randint(4, 10)})
+
+    for day in DAYS:
+        free = [True] * N_ROWS
+        n_courses = max(0, int(round(rng.gauss(density, 1.0)))) if density else 0
+        for _ in range(n_courses):
+            course = random_course(rng, used_codes)
+            rows = rng.choice(DURATIONS)
+            starts = [r for r in range(N_ROWS - rows + 1) if all(free[r:r + rows])]
+            # A course can't share a cell with a holiday block in any of its weeks
+            starts = [r for r in starts if not any(
+                h["week"] in course["weeks"] and r < h["row"] + h["rows"] and h["row"] < r + rows
+                for h in days[day]["holidays"])]
+            if not starts:
+                continue
+            start = rng.choice(starts)
+            for r in range(start, start + rows):
+                free[r] = False
+            course.update(row=start, rows=rows)
+            days[day]["courses"].append(course)
+    return {"semester_start": semester_start, "days": days}
+
+
+def ground_truth(timetable):
+    """Merged entries extract_timetable should produce, in page order."""
+    dates = week_dates(timetable["semester_start"])
+    entries = []
+    for day_index, day in enumerate(DAYS):
+        page = timetable["days"][day]
+        # Blocks per column, top to bottom, to find courses directly under a holiday
+        below_holiday = {}
+        for week in TEACHING_WEEKS:
+            blocks = sorted([(c["row"], "course", id(c)) for c in page["courses"] if week in c["weeks"]] +
+                            [(h["row"], "holiday", h["name"]) for h in page["holidays"] if h["week"] == week])
+            for (_, kind, value), (_, next_kind, next_value) in zip(blocks, blocks[1:]):
+                if kind == "holiday" and next_kind == "course":
+                    below_holiday.setdefault(next_value, []).append(f"{value} on Week {week}")
+
+        # The pipeline reads columns left to right, so the first week seeds each merge
+        for course in sorted(page["courses"], key=lambda c: (WEEKS.index(c["weeks"][0]), c["row"])):
+            start, end = row_label(course["row"])[0], row_label(course["row"] + course["rows"] - 1)[1]
+            monday = dates[course["weeks"][0]][0]
+            entries.append({
+                "courseCode": course["courseCode"],
+                "group": course["group"],
+                "location": course["location"],
+                "weeks": course["weeks"],
+                "time": f"{start}-{end}",
+                "day": day,
+                "startDate": (monday + timedelta(days=day_index)).strftime("%d %b %y"),
+                "note": "; ".join(sorted(set(below_holiday.get(id(course), [])))),
+            })
+    return entries
+
+
+# === Rendering ===
+def render_page(timetable, day, page_number, n_pages, fonts):
+    image = Image.new("RGB", IMAGE_SIZE, "white")
+    draw = ImageDraw.Draw(image)
+    page = timetable["days"][day]
+    dates = week_dates(timetable["semester_start"])
+
+    # Day title bar
+    draw.rectangle((LEFT, TITLE_Y, RIGHT, WEEK_Y), fill=GREY, outline=LINE_GREY, width=2)
+    draw.text(((LEFT + RIGHT) / 2, (TITLE_Y + WEEK_Y) / 2), day, font=fonts["title"], fill="black", anchor="mm")
+
+    # Recess column shading under the header
+    rx1, rx2 = column_x("Recess")
+    draw.rectangle((rx1, WEEK_Y, rx2, GRID_BOTTOM), fill=RECESS_GREY)
+
+    # Week labels and date lines
+    for col, label in enumerate(["Week"] + WEEKS):
+        x1 = LEFT + col * COL_W
+        draw.text((x1 + COL_W / 2, (WEEK_Y + DATE_Y) / 2), label, font=fonts["header"], fill="black", anchor="mm")
+        if col == 0:
+            draw_centered(draw, ["Time \\", "Date"], fonts["date"], (x1, DATE_Y, x1 + COL_W, GRID_Y), "black", 30)
+        else:
+            monday, friday = dates[label]
+            draw_centered(draw, [monday.strftime("%d %b %y"), friday.strftime("%d %b %y")], fonts["date"],
+                          (x1, DATE_Y, x1 + COL_W, GRID_Y), "black", 30)
+
+    # Time column
+    for row in range(N_ROWS):
+        draw_centered(draw, [f"{row_label(row)[0]}-", row_label(row)[1]], fonts["time"],
+                      (LEFT, row_y(row), LEFT + COL_W, row_y(row + 1)), "black", 40)
+
+    # Holiday and course blocks
+    for h in page["holidays"]:
+        x1, x2 = column_x(h["week"])
+        box = (x1, row_y(h["row"]), x2, row_y(h["row"] + h["rows"]))
+        draw.rectangle(box, fill=YELLOW)
+        lines = wrap(draw, h["name"], fonts["block"], COL_W - 16)
+        draw_centered(draw, lines, fonts["block"], box, HOLIDAY_BLUE, 28)
+    for c in page["courses"]:
+        for week in c["weeks"]:
+            x1, x2 = column_x(week)
+            box = (x1, row_y(c["row"]), x2, row_y(c["row"] + c["rows"]))
+            draw.rectangle(box, fill=CYAN)
+            draw_centered(draw, [c["courseCode"], c["group"], c["location"]], fonts["block"], box, "black", 28)
+
+    # Grid lines: row lines stop at course blocks, as in the export
+    covered = {(w, r) for c in page["courses"] for w in c["weeks"] for r in range(c["row"] + 1, c["row"] + c["rows"])}
+    covered |= {(h["week"], r) for h in page["holidays"] for r in range(h["row"] + 1, h["row"] + h["rows"])}
+    for row in range(N_ROWS + 1):
+        y = row_y(row)
+        draw.line((LEFT, y, LEFT + COL_W, y), fill=LINE_GREY, width=2)
+        for week in WEEKS:
+            if (week, row) not in covered:
+                x1, x2 = column_x(week)
+                draw.line((x1, y, x2, y), fill=LINE_GREY, width=2)
+    for col in range(16):
+        x = LEFT + col * COL_W
+        draw.line((x, WEEK_Y, x, GRID_BOTTOM), fill=LINE_GREY, width=2)
+    for y in (WEEK_Y, DATE_Y):
+        draw.line((LEFT, y, RIGHT, y), fill=LINE_GREY, width=2)
+
+    draw.text((RIGHT - 30, GRID_BOTTOM + 60), f"Page {page_number} of {n_pages}", font=fonts["header"],
+              fill="black", anchor="rm")
+    return image
+
+
+def render_pdf(timetable, path):
+    fonts = {"title": load_font(36), "header": load_font(34), "date": load_font(22),
+             "time": load_font(30), "block": load_font(22)}
+    pages = [render_page(timetable, day, i + 1, len(DAYS), fonts) for i, day in enumerate(DAYS)]
+    pages[0].save(path, "PDF", resolution=DPI, save_all=True, append_images=pages[1:])
+    for page in pages:
+        page.close()
+
+
+def write_timetable(out_dir, name, seed, density=6, holidays=2, semester_start=date(2022, 8, 8)):
+    """Generate one timetable; returns (pdf path, ground-truth json path)."""
+    rng = random.Random(seed)
+    timetable = generate_timetable(rng, density, holidays, semester_start)
+    pdf_path = os.path.join(out_dir, f"{name}.pdf")
+    json_path = os.path.join(out_dir, f"{name}.json")
+    render_pdf(timetable, pdf_path)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"pdf": os.path.basename(pdf_path), "seed": seed, "density": density, "holidays": holidays,
+                   "semester_start": semester_start.isoformat(), "pages": len(DAYS),
+                   "entries": ground_truth(timetable)}, f, indent=2)
+    return pdf_path, json_path
+
+
+def generate_set(out_dir, count, density=6, holidays=2, seed=0, semester_start=date(2022, 8, 8)):
+    os.makedirs(out_dir, exist_ok=True)
+    return [write_timetable(out_dir, f"timetable_{seed + i:04d}", seed + i, density, holidays, semester_start)
+            for i in range(count)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render synthetic timetable PDFs with ground truth")
+    ap.add_argument("--out", default="synthetic")
+    ap.add_argument("--count", type=int, default=10)
+    ap.add_argument("--density", type=float, default=6, help="courses per day on average")
+    ap.add_argument("--holidays", type=int, default=2, help="holiday blocks per timetable")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--semester-start", type=date.fromisoformat, default=date(2022, 8, 8),
+                    help="Monday of week 1 (YYYY-MM-DD)")
+    args = ap.parse_args()
+
+    for pdf_path, json_path in generate_set(args.out, args.count, args.density, args.holidays, args.seed,
+                                            args.semester_start):
+        print(pdf_path, json_path)
+
+
+if __name__ == "__main__":
+    main()
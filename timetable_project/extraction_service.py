@@ -0,0 +1,244 @@
+# Long-running extraction backend shared by the Streamlit app and other tools.
+#
+#   python extraction_service.py --port 8765 --workers 2 --queue-size 16
+#
+#   POST /jobs               body = PDF bytes  -> 202 {"id", "status"}; 429 when the queue is full
+#   GET  /jobs/<id>          job status and timings
+#   GET  /jobs/<id>/result   extracted entries (JSON)
+#   GET  /jobs/<id>/ics      calendar for the entries (text/calendar)
+#   GET  /health             queue depth, workers, model state
+#
+# The YOLO model and OCR engines are loaded once and shared by the worker threads;
+# set TIMETABLE_SERVICE_URL in the app to use this instead of extracting in-process.
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from scripts.utils.options import ExtractOptions
+from scripts.utils import tracing
+
+
+class Job:
+    def __init__(self, pdf_path, filename=""):
+        self.id = uuid.uuid4().hex
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.entries = None
+        self.error = None
+        self.trace = None
+
+    def info(self):
+        info = {"id": self.id, "status": self.status, "filename": self.filename, "created": self.created,
+                "started": self.started, "finished": self.finished}
+        if self.started:
+            info["queue_seconds"] = round(self.started - self.created, 3)
+        if self.finished:
+            info["run_seconds"] = round(self.finished - self.started, 3)
+        if self.entries is not None:
+            info["n_entries"] = len(self.entries)
+        if self.error:
+            info["error"] = self.error
+        if self.trace:
+            info["trace"] = self.trace
+        return info
+
+
+class JobManager:
+    """
+    Bounded job queue served by worker threads. `submit` raises queue.Full instead of
+    blocking, which the HTTP layer turns into 429. Finished jobs are kept for lookup
+    until `max_jobs` newer ones push them out.
+    """
+
+    def __init__(self, workers=2, queue_size=16, options=None, max_jobs=1000, extract=None):
+        self.options = options or ExtractOptions.from_env()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.max_jobs = max_jobs
+        self.lock = threading.Lock()
+        self.running = 0
+        self._extract = extract
+        self.threads = [threading.Thread(target=self._work, name=f"extract-{i}", daemon=True) for i in range(workers)]
+
+    def start(self, warm_up=True):
+        if self._extract is None:
+            from scripts.extract_timetable import extract_timetable_cached
+            from scripts.utils.ocr_engine import set_ocr_backend
+            set_ocr_backend(self.options.ocr_backend)
+            self._extract = extract_timetable_cached
+            if warm_up:
+                from scripts.layout_detector import layout_model
+                from scripts.utils.constants import IMAGE_SIZE
+                layout_model.warm_up(IMAGE_SIZE)  # load before the first request, not during it
+        for t in self.threads:
+            t.start()
+
+    def submit(self, pdf_path, filename=""):
+        job = Job(pdf_path, filename)
+        with self.lock:
+            self.jobs[job.id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.id]
+            raise
+        self._trim()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _trim(self):
+        with self.lock:
+            finished = [j for j in self.jobs.values() if j.status in ("done", "error")]
+            for job in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[job.id]
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.running += 1
+            job.status, job.started = "running", time.time()
+            try:
+                options = self.options
+                with tracing.trace(options.trace or options.low_memory, memory=options.low_memory) as tracer:
+                    job.entries = self._extract(job.pdf_path, options)
+                if tracer is not None:
+                    job.trace = {"summary": tracer.summary(), "counters": dict(tracer.counters)}
+                job.status = "done"
+            except Exception as e:
+                logging.exception("Job %s failed", job.id)
+                job.error, job.status = f"{type(e).__name__}: {e}", "error"
+            finally:
+                job.finished = time.time()
+                with self.lock:
+                    self.running -= 1
+                try:
+                    os.remove(job.pdf_path)
+                except OSError:
+                    pass
+                self.queue.task_done()
+
+    def health(self):
+        from scripts.layout_detector import layout_model
+        with self.lock:
+            return {"status": "ok", "workers": len(self.threads), "running": self.running,
+                    "queued": self.queue.qsize(), "queue_size": self.queue.maxsize,
+                    "jobs": len(self.jobs), "model": layout_model.stats()}
+
+
+def make_handler(manager, max_upload_mb=20):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, content_type="application/json", headers=None):
+            data = body if isinstance(body, bytes) else json.dumps(body, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0:
+                return self._send(400, {"error": "send the PDF bytes as the request body"})
+            if length > max_upload_mb * 1024 * 1024:
+                self.close_connection = True
+                return self._send(413, {"error": f"PDF larger than {max_upload_mb} MB"})
+            data = self.rfile.read(length)
+            if not data.startswith(b"%PDF"):
+                return self._send(415, {"error": "body is not a PDF"})
+            if manager.queue.full():
+                return self._send(429, {"error": "queue full, retry later"}, headers={"Retry-After": "5"})
+
+            fd, path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                job = manager.submit(path, unquote(self.headers.get("X-Filename", "")))
+            except queue.Full:
+                os.remove(path)
+                return self._send(429, {"error": "queue full, retry later"}, headers={"Retry-After": "5"})
+            self._send(202, {"id": job.id, "status": job.status}, headers={"Location": f"/jobs/{job.id}"})
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts == ["health"]:
+                return self._send(200, manager.health())
+            if not parts or parts[0] != "jobs" or len(parts) not in (2, 3):
+                return self._send(404, {"error": "not found"})
+
+            job = manager.get(parts[1])
+            if job is None:
+                return self._send(404, {"error": "unknown job"})
+            if len(parts) == 2:
+                return self._send(200, job.info())
+
+            if job.status == "error":
+                return self._send(500, job.info())
+            if job.status != "done":
+                return self._send(409, job.info(), headers={"Retry-After": "1"})
+            if parts[2] == "result":
+                return self._send(200, job.entries)
+            if parts[2] == "ics":
+                from scripts.utils.ics_writer import generate_ics_bytes
+                ics_bytes, errors = generate_ics_bytes(job.entries)
+                if errors:
+                    return self._send(422, {"error": "entries need fixing before export", "details": errors})
+                return self._send(200, ics_bytes, content_type="text/calendar",
+                                  headers={"Content-Disposition": 'attachment; filename="timetable.ics"'})
+            return self._send(404, {"error": "not found"})
+
+        def log_message(self, fmt, *args):
+            logging.info("%s %s", self.address_string(), fmt % args)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timetable extraction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="jobs extracted concurrently")
+    parser.add_argument("--queue-size", type=int, default=16, help="waiting jobs before POST /jobs returns 429")
+    parser.add_argument("--max-upload-mb", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    manager = JobManager(workers=args.workers, queue_size=args.queue_size)
+    manager.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(manager, args.max_upload_mb))
+    logging.info("Extraction service on http://%s:%d (%d workers, queue %d)",
+                 args.host, args.port, args.workers, args.queue_size)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
+import os
 import re
+import atexit
+import threading
+from bisect import bisect_right
+import logging
+from contextlib import contextmanager
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
 from datetime import datetime, timedelta
-from pdf2image import convert_from_path
-from pytesseract import image_to_data, Output
-from sklearn.cluster import DBSCAN
 import numpy as np
-from rapidfuzz import process, fuzz
+from rapidfuzz import fuzz
 import cv2
-from scripts.utils.ocr_utils import clean_text
-from scripts.utils.constants import DAYS, WEEKS, KNOWN_HOLIDAYS
-from scripts.layout_detector import get_refined_layout_boxes
+from scripts.utils.ocr_engine import get_ocr_backend, ocr_image_to_data, set_ocr_backend
+from scripts.utils.ocr_utils import clean_text, reading_order, threshold_for_ocr, crop_view
+from scripts.utils.token_index import TokenIndex
+from scripts.utils.line_grouping import group_lines_1d
+from scripts.utils.constants import DAYS, WEEKS
+from scripts.utils.course_entry import CourseEntry, WEEK_BITS, parse_time_range
+from scripts.utils.holiday_matcher import get_holiday_matcher
+from scripts.utils.options import ExtractOptions
+from scripts.utils.page_source import PdfPageSource
+from scripts.utils.pdf_text import extract_text_layer
+from scripts.utils.result_cache import get_result_cache, file_sha256
+from scripts.utils import tracing
+from scripts.layout_detector import (get_refined_layout_boxes, get_refined_layout_boxes_batch,
+                                     LAYOUT_BACKEND, LAYOUT_BACKENDS, LAYOUT_IMGSZ)
 from dateutil import parser
 
 def dedup(text):
@@ -27,10 +43,9 @@ def week_sort_key(w):
     return 7.5 if w == "Recess" else int(w)
 
 def time_overlap(t1, t2):
-    def to_minutes(t): return int(t[:2]) * 60 + int(t[2:])
-    s1, e1 = t1.split('-')
-    s2, e2 = t2.split('-')
-    return not (to_minutes(e1) <= to_minutes(s2) or to_minutes(e2) <= to_minutes(s1))
+    s1, e1 = parse_time_range(t1)
+    s2, e2 = parse_time_range(t2)
+    return not (e1 <= s2 or e2 <= s1)
 
 
 def is_month_like(token, threshold=80):
@@ -41,7 +56,23 @@ def is_month_like(token, threshold=80):
 
 
 
-def extract_week_date_ranges(image, weeks_box):
+def parse_week_date_pair(lines):
+    """Parse "14 Aug 23 18 Aug 23"-style header tokens into a (start, end) pair, or None."""
+    if len(lines) < 6:
+        return None
+    try:
+        start = datetime.strptime(" ".join(lines[0:3]), "%d %b %y")
+        end = datetime.strptime(" ".join(lines[3:6]), "%d %b %y")
+        return start, end
+    except ValueError:
+        return None
+
+
+def extract_week_date_ranges(image, weeks_box, token_index=None, allow_ocr=True):
+    """
+    Read the start/end date printed under each week header. The page token index
+    is queried first; a header cell is only re-OCR'd if that yields no valid dates.
+    """
     week_columns = get_weeks(weeks_box)
     box_height = weeks_box["y2"] - weeks_box["y1"]
     y1 = weeks_box["y2"]
@@ -50,27 +81,21 @@ def extract_week_date_ranges(image, weeks_box):
     week_to_date_pair = {}
     for i, wk in enumerate(week_columns[1:]):  # skip "Week"
         x1, x2 = int(wk["x1"]), int(wk["x2"])
-        crop = image.crop((x1 - 5, int(y1), x2 + 5, int(y2)))
-
-        lines = [line.strip() for line in image_to_data(crop, output_type=Output.DICT)["text"] if line.strip()]
-
-        if len(lines) >= 6:
-            try:
-                start_str = " ".join(lines[0:3])
-                end_str   = " ".join(lines[3:6])
-                start = datetime.strptime(start_str, "%d %b %y")
-                end = datetime.strptime(end_str, "%d %b %y")
-
-                week_to_date_pair[wk["label"]] = (start, end)
-            except:
-                week_to_date_pair[wk["label"]] = ("UNKNOWN", "UNKNOWN")
-        else:
-            week_to_date_pair[wk["label"]] = ("UNKNOWN", "UNKNOWN")
+        pair = None
+        if token_index is not None:
+            region = reading_order(token_index.query(x1 - 5, int(y1), x2 + 5, int(y2)))
+            pair = parse_week_date_pair(region["text"].tolist())
+        if pair is None and allow_ocr:
+            crop = image.crop((x1 - 5, int(y1), x2 + 5, int(y2)))
+            tracing.count("ocr_crops")
+            lines = [line.strip() for line in ocr_image_to_data(crop)["text"] if line.strip()]
+            pair = parse_week_date_pair(lines)
+        week_to_date_pair[wk["label"]] = pair or ("UNKNOWN", "UNKNOWN")
 
     return week_to_date_pair
 
 
-def extract_base_start_date_from_weeks(image, week_boxes):
+def extract_base_start_date_from_weeks(image, week_boxes, page_thresh=None):
     if week_boxes.empty:
         # print("❌ No week box (class 1) found.")
         return None
@@ -83,21 +108,15 @@ def extract_base_start_date_from_weeks(image, week_boxes):
     y2 = week_boxes["y1"]
     y1 = y2 - 60  # go upwards above week label
 
-    # Crop image
-    cropped = image.crop((x1, y1, x2, y2))
-    img = np.array(cropped.convert("RGB"))
-
-    # HSV masking & preprocessing
-    hsv = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)
-    cyan_mask = cv2.inRange(hsv, (70, 20, 100), (110, 255, 255))
-    img[cyan_mask > 0] = [255, 255, 255]
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    norm = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
-    thresh = cv2.adaptiveThreshold(norm, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                   cv2.THRESH_BINARY, 15, 10)
+    # HSV masking & preprocessing (reuse the page-level threshold if we have one)
+    if page_thresh is not None:
+        thresh = crop_view(page_thresh, x1, y1, x2, y2)
+    else:
+        thresh = threshold_for_ocr(image.crop((x1, y1, x2, y2)))
 
     config = r'--psm 6'
-    ocr_data = image_to_data(thresh, output_type=Output.DICT, config=config)
+    tracing.count("ocr_crops")
+    ocr_data = ocr_image_to_data(thresh, config=config)
     lines = [t.strip() for t in ocr_data["text"] if t.strip()]
     text = " ".join(lines)
 
@@ -109,16 +128,6 @@ def extract_base_start_date_from_weeks(image, week_boxes):
         return "UNKNOWN"
 
 
-
-def detect_holiday_from_ocr(lines, threshold=80):
-    """Try to match joined OCR lines to a known holiday using fuzzy matching."""
-    joined = " ".join(lines).lower().strip()
-    match, score, _ = process.extractOne(joined, KNOWN_HOLIDAYS, scorer=fuzz.token_sort_ratio)
-    if score >= threshold:
-        return match.upper()  # standardized clean name
-    return None
-
-
 def get_weeks(week_box, shrink_ratio=0.1):
     week_labels = ["Week"] + WEEKS
     col_width = (week_box["x2"] - week_box["x1"]) / 15
@@ -147,7 +156,8 @@ def get_time_rows(time_box):
     } for i in range(28)]
 
 def extract_ocr_df(image):
-    ocr = image_to_data(image, output_type=Output.DICT)
+    with tracing.span("ocr_page"):
+        ocr = ocr_image_to_data(image)
     df = pd.DataFrame({
         "text": pd.Series(ocr["text"]).str.strip(),
         "conf": ocr["conf"],
@@ -163,17 +173,16 @@ def extract_ocr_df(image):
     df["yc"] = (df["y1"] + df["y2"]) / 2
     return df
 
-def extract_ocr_from_block(img_pil, offset_x=0, offset_y=0):
-    img = np.array(img_pil.convert("RGB"))
-    hsv = cv2.cvtColor(img, cv2.COLOR_RGB2HSV)
-    cyan_mask = cv2.inRange(hsv, (70, 20, 100), (110, 255, 255))
-    img[cyan_mask > 0] = [255, 255, 255]
-    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-    norm = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
-    thresh = cv2.adaptiveThreshold(norm, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                   cv2.THRESH_BINARY, 15, 10)
+def extract_ocr_from_block(block, offset_x=0, offset_y=0, thresholded=False):
+    """
+    OCR a course block. `block` is a PIL crop, or with thresholded=True a view
+    into the page returned by `threshold_for_ocr`.
+    """
+    thresh = block if thresholded else threshold_for_ocr(block)
     config = r'--oem 3 --psm 6'
-    data = image_to_data(thresh, output_type=Output.DICT, config=config)
+    tracing.count("ocr_crops")
+    with tracing.span("column_ocr"):
+        data = ocr_image_to_data(thresh, config=config)
     df = pd.DataFrame({
         "text": pd.Series(data["text"]).str.strip(),
         "conf": data["conf"],
@@ -192,199 +201,548 @@ def extract_ocr_from_block(img_pil, offset_x=0, offset_y=0):
     return df
 
 
-def extract_courses(image, course_df, weeks, time_rows, day, week_to_date_pair):
+def extract_column_entries(ocr_inside, wk, time_rows, day, week_to_date_pair):
+    """Group the tokens of one week column into lines and read the 3-line course blocks."""
+    entries = []
+    # Same clusters as DBSCAN(eps=20, min_samples=1) on yc
+    with tracing.span("line_grouping"):
+        ocr_inside["line_group"] = group_lines_1d(ocr_inside["yc"].values, gap=20)
+    grouped = list(ocr_inside.groupby("line_group", sort=False))
+    line_map = [" ".join(group.sort_values("x1")["text"].values) for _, group in grouped]
+
+    index_to_group_id = {i: group_id for i, (group_id, _) in enumerate(grouped)}
+
+    # 🧹 Clean every line once, and score all single lines and adjacent pairs in one go
+    cleaned = [clean_text(line) for line in line_map]
+    matcher = get_holiday_matcher()
+    with tracing.span("holiday_match"):
+        single_holiday, pair_holiday = matcher.match_lines(cleaned)
+
+    used_lines = set()
+    i = 0
+    while i < len(line_map):
+        if i in used_lines:
+            i += 1
+            continue
+
+        # === Step 1: Detect holiday block ===
+        note_lines = []
+        note_index = None
+
+        while i < len(line_map):
+            maybe_combo = pair_holiday[i]
+            if maybe_combo:
+                if maybe_combo not in note_lines:
+                    note_lines.append(maybe_combo)
+                note_index = i + 2
+                i += 2
+                continue
+
+            maybe_single = single_holiday[i]
+            if maybe_single:
+                if maybe_single not in note_lines:
+                    note_lines.append(maybe_single)
+                note_index = i + 1
+                i += 1
+                continue
+
+            break
+
+        # === Step 2: Look for next 3 non-holiday lines ===
+        while i <= len(line_map) - 3:
+            if not any(matcher.is_holiday_name(cleaned[j]) for j in range(i, i + 3)):
+                break
+            i += 1
+        else:
+            break
+
+        course_lines = cleaned[i:i + 3]
+
+        # ✅ Only attach note if this block comes right after holiday
+        note = ""
+        if note_lines and i == note_index:
+            unique_lines = list(dict.fromkeys(note_lines))
+            note = f"{' '.join(unique_lines).strip()} on Week {wk['label']}"
+
+        def is_location(t):
+            t = t.upper()
+            return (
+                t.startswith(("TR", "LT", "LKC", "S")) or
+                "+" in t or "-" in t or
+                (any(c.isdigit() for c in t) and any(c.isalpha() for c in t) and len(t) >= 5)
+            )
+
+        def is_course_code(t):
+            t = t.upper()
+            return (
+                len(t) >= 5 and
+                any(c.isdigit() for c in t) and
+                any(c.isalpha() for c in t) and
+                not is_location(t)
+            )
+
+        courseCode = next((x for x in course_lines if is_course_code(x)), course_lines[0])
+        location = next((x for x in course_lines if is_location(x) and x != courseCode), course_lines[2])
+        group = next((x for x in course_lines if x not in [courseCode, location]), course_lines[1])
+
+        group_ids = [index_to_group_id.get(j, -1) for j in range(i, i+3)]
+        y_groups = ocr_inside[ocr_inside["line_group"].isin(group_ids)]
+        y1_lines = y_groups["y1"].min()
+        y2_lines = y_groups["y2"].max()
+
+        matched_times = [r["label"] for r in time_rows if not (r["y2"] < y1_lines or r["y1"] > y2_lines)]
+        if not matched_times:
+            i += 1
+            continue
+
+        start_min = parse_time_range(matched_times[0])[0]
+        end_min = parse_time_range(matched_times[-1])[1]
+
+        start, end = week_to_date_pair.get(wk["label"], ("UNKNOWN", "UNKNOWN"))
+        day_offset = DAYS.index(day)
+
+        if isinstance(start, datetime):
+            start_date = (start + timedelta(days=day_offset)).strftime("%d %b %y")
+        else:
+            start_date = "UNKNOWN"
+
+        entries.append(CourseEntry(
+            course_code=courseCode,
+            group=group,
+            location=location,
+            week_mask=WEEK_BITS[wk["label"]],
+            start=start_min,
+            end=end_min,
+            day=day,
+            start_date=start_date,
+            note=note,
+        ))
+
+        used_lines.update({i, i+1, i+2})
+        i += 3
+
+    return entries
+
+
+def assign_week_columns(tokens, columns):
+    """
+    Assign each token to exactly one week column by its x-centre.
+    `columns` is a list of (x1, x2) ranges; tokens inside several (the margins
+    overlap slightly) go to the column whose centre is nearest. Returns -1 for none.
+    """
+    xc = tokens["xc"].to_numpy(dtype=float)[:, None]
+    bounds = np.asarray(columns, dtype=float)
+    inside = (xc >= bounds[:, 0]) & (xc <= bounds[:, 1])
+    dist = np.abs(xc - bounds.mean(axis=1))
+    dist[~inside] = np.inf
+    return np.where(inside.any(axis=1), dist.argmin(axis=1), -1)
+
+
+def extract_courses(image, course_df, weeks, time_rows, day, week_to_date_pair, token_index=None, ocr_mode="region",
+                    page_thresh=None):
+    """
+    ocr_mode="region" OCRs each course block once and splits its tokens into week
+    columns by x-coordinate; "column" runs Tesseract on every column crop separately.
+    If `token_index` is given (PDF text layer), tokens are looked up instead of OCR'd.
+    `page_thresh` is `threshold_for_ocr(image)` if the caller already has it.
+    """
     entries = []
+    margin = 10  # pixels
+    # Mask/threshold the page once; each OCR call gets a zero-copy slice of it
+    if page_thresh is None and token_index is None and not course_df.empty:
+        page_thresh = threshold_for_ocr(image)
     for _, blk in course_df.iterrows():
         bx1, bx2, by1, by2 = blk["x1"], blk["x2"], blk["y1"], blk["y2"]
+        columns = []
         for wk in weeks:
             if wk["index"] == 0 or bx2 < wk["x1"] or bx1 > wk["x2"]:
                 continue
+            columns.append((wk, max(bx1, wk["x1"] - margin), min(bx2, wk["x2"] + margin)))
+        if not columns:
+            continue
 
-            margin = 10  # pixels
-            sx1 = max(bx1, wk["x1"] - margin)
-            sx2 = min(bx2, wk["x2"] + margin)
-            cropped = image.crop((sx1, by1, sx2, by2))
-            ocr_inside = extract_ocr_from_block(cropped, offset_x=sx1, offset_y=by1)
-            if ocr_inside.empty:
+        if token_index is not None or ocr_mode == "region":
+            rx1 = min(sx1 for _, sx1, _ in columns)
+            rx2 = max(sx2 for _, _, sx2 in columns)
+            if token_index is not None:
+                region_tokens = token_index.query(rx1, by1, rx2, by2)
+            else:
+                block = crop_view(page_thresh, rx1, by1, rx2, by2)
+                region_tokens = extract_ocr_from_block(block, offset_x=rx1, offset_y=by1, thresholded=True)
+            if region_tokens.empty:
                 continue
+            column_ids = assign_week_columns(region_tokens, [(sx1, sx2) for _, sx1, sx2 in columns])
+            per_column = [region_tokens[column_ids == k].copy() for k in range(len(columns))]
+        else:
+            per_column = []
+            for _, sx1, sx2 in columns:
+                block = crop_view(page_thresh, sx1, by1, sx2, by2)
+                per_column.append(extract_ocr_from_block(block, offset_x=sx1, offset_y=by1, thresholded=True))
 
-            y_coords = ocr_inside["yc"].values.reshape(-1, 1)
-            labels = DBSCAN(eps=20, min_samples=1).fit(y_coords).labels_
-            ocr_inside["line_group"] = labels
-            grouped = list(ocr_inside.groupby("line_group", sort=False))
-            line_map = [" ".join(group.sort_values("x1")["text"].values) for _, group in grouped]
-
-            index_to_group_id = {i: group_id for i, (group_id, _) in enumerate(grouped)}
-
-            used_lines = set()
-            i = 0
-            while i < len(line_map):
-                if i in used_lines:
-                    i += 1
-                    continue
-
-                # === Step 1: Detect holiday block ===
-                note_lines = []
-                note_index = None
-
-                while i < len(line_map):
-                    current = clean_text(line_map[i])
-                    next_line = clean_text(line_map[i + 1]) if i + 1 < len(line_map) else ""
-
-                    maybe_combo = detect_holiday_from_ocr([current, next_line])
-                    if maybe_combo:
-                        if maybe_combo not in note_lines:
-                            note_lines.append(maybe_combo)
-                        note_index = i + 2
-                        i += 2
-                        continue
-
-                    maybe_single = detect_holiday_from_ocr([current])
-                    if maybe_single:
-                        if maybe_single not in note_lines:
-                            note_lines.append(maybe_single)
-                        note_index = i + 1
-                        i += 1
-                        continue
-
-                    break
-
-                # === Step 2: Look for next 3 non-holiday lines ===
-                while i <= len(line_map) - 3:
-                    block = [clean_text(line_map[j]) for j in range(i, i + 3)]
-                    if all(line.lower() not in KNOWN_HOLIDAYS for line in block):
-                        break
-                    i += 1
-                else:
-                    break
-
-                course_lines = [clean_text(line_map[j]) for j in range(i, i + 3)]
-
-                # ✅ Only attach note if this block comes right after holiday
-                note = ""
-                if note_lines and i == note_index:
-                    unique_lines = list(dict.fromkeys(note_lines))
-                    note = f"{' '.join(unique_lines).strip()} on Week {wk['label']}"
-
-                def is_location(t):
-                    t = t.upper()
-                    return (
-                        t.startswith(("TR", "LT", "LKC", "S")) or
-                        "+" in t or "-" in t or
-                        (any(c.isdigit() for c in t) and any(c.isalpha() for c in t) and len(t) >= 5)
-                    )
-
-                def is_course_code(t):
-                    t = t.upper()
-                    return (
-                        len(t) >= 5 and
-                        any(c.isdigit() for c in t) and
-                        any(c.isalpha() for c in t) and
-                        not is_location(t)
-                    )
-
-                courseCode = next((x for x in course_lines if is_course_code(x)), course_lines[0])
-                location = next((x for x in course_lines if is_location(x) and x != courseCode), course_lines[2])
-                group = next((x for x in course_lines if x not in [courseCode, location]), course_lines[1])
-
-                group_ids = [index_to_group_id.get(j, -1) for j in range(i, i+3)]
-                y_groups = ocr_inside[ocr_inside["line_group"].isin(group_ids)]
-                y1_lines = y_groups["y1"].min()
-                y2_lines = y_groups["y2"].max()
-
-                matched_times = [r["label"] for r in time_rows if not (r["y2"] < y1_lines or r["y1"] > y2_lines)]
-                if not matched_times:
-                    i += 1
-                    continue
-
-                time_range = f"{matched_times[0].split('-')[0]}-{matched_times[-1].split('-')[1]}"
-
-                start, end = week_to_date_pair.get(wk["label"], ("UNKNOWN", "UNKNOWN"))
-                day_offset = DAYS.index(day)
-
-                if isinstance(start, datetime):
-                    start_date = (start + timedelta(days=day_offset)).strftime("%d %b %y")
-                else:
-                    start_date = "UNKNOWN"
-
-                entries.append({
-                    "courseCode": courseCode,
-                    "group": group,
-                    "location": location,
-                    "weeks": [wk["label"]],
-                    "time": time_range,
-                    "day": day,
-                    "startDate": start_date,
-                    "note": note
-                })
-
-                used_lines.update({i, i+1, i+2})
-                i += 3
+        for (wk, _, _), ocr_inside in zip(columns, per_column):
+            if ocr_inside.empty:
+                continue
+            entries.extend(extract_column_entries(ocr_inside, wk, time_rows, day, week_to_date_pair))
 
     return entries
 
 
-def merge_entries(entries):
-    def score_course_code(code):
-        tokens = re.findall(r"[A-Z0-9]+", code)
-        return (len(tokens), len(code))
+def score_course_code(code):
+    tokens = re.findall(r"[A-Z0-9]+", code)
+    return (len(tokens), len(code))
+
+
+def merge_group(group):
+    """Collapse CourseEntry items that were grouped around group[0] into one entry."""
+    e1 = group[0]
+    course_codes = list(dict.fromkeys(e.course_code for e in group))  # first max wins either way
+    best_code = dedup(clean_text(max(course_codes, key=score_course_code)))
+    get_common = lambda field: max(set(field), key=field.count)
+    group_field = dedup(clean_text(get_common([e.group for e in group])))
+    location_field = dedup(clean_text(get_common([e.location for e in group])))
+    if all(e.raw_weeks is None for e in group):
+        week_mask, raw_weeks = 0, None
+        for e in group:
+            week_mask |= e.week_mask  # union of weeks, already in calendar order
+    else:
+        week_mask = 0
+        raw_weeks = tuple(sorted(set(w for e in group for w in e.weeks), key=week_sort_key))
+    notes = "; ".join(sorted(set(e.note for e in group if e.note)))
+    return CourseEntry(
+        course_code=best_code,
+        group=group_field,
+        location=location_field,
+        week_mask=week_mask,
+        raw_weeks=raw_weeks,
+        start=e1.start,
+        end=e1.end,
+        raw_time=e1.raw_time,
+        day=e1.day,
+        start_date=e1.start_date,
+        note=notes,
+    )
+
 
+def merge_entries(entries):
+    """
+    Greedy merge of overlapping CourseEntry items (plain dicts are converted), returning
+    dicts in the usual JSON shape. Taking unused entries in list order as seeds,
+    each seed absorbs every later unused entry on the same day whose time overlaps
+    the seed's own time (not transitively).
+
+    Each day's entries are sorted by start minute, so a seed only looks at entries
+    starting in [seed start - longest duration, seed end). Entries already absorbed
+    are skipped through a path-compressed "next unused" table. Output matches the
+    pairwise O(n²) scan exactly.
+    """
+    if not entries:
+        return []
+
+    items = [e if isinstance(e, CourseEntry) else CourseEntry.from_dict(e) for e in entries]
+
+    by_day = {}
+    for idx, e in enumerate(items):
+        by_day.setdefault(e.day, []).append(idx)
+
+    # Per day: indices sorted by start, their starts, and the longest duration
+    day_order, day_starts, day_maxdur, day_next = {}, {}, {}, {}
+    position = [0] * len(items)
+    for day, idxs in by_day.items():
+        idxs.sort(key=lambda k: items[k].start)
+        for pos, k in enumerate(idxs):
+            position[k] = pos
+        day_order[day] = idxs
+        day_starts[day] = [items[k].start for k in idxs]
+        day_maxdur[day] = max(0, max(items[k].end - items[k].start for k in idxs))
+        day_next[day] = list(range(len(idxs) + 1))  # next unused position, len = sentinel
+
+    def next_unused(nxt, pos):
+        root = pos
+        while nxt[root] != root:
+            root = nxt[root]
+        while nxt[pos] != root:
+            nxt[pos], pos = root, nxt[pos]
+        return root
+
+    used = [False] * len(items)
     merged = []
-    used = [False] * len(entries)
-    for i, e1 in enumerate(entries):
+    for i, e1 in enumerate(items):
         if used[i]:
             continue
-        group = [e1]
         used[i] = True
-        for j in range(i + 1, len(entries)):
-            e2 = entries[j]
-            if used[j]:
-                continue
-            if e1["day"] == e2["day"] and time_overlap(e1["time"], e2["time"]):
-                group.append(e2)
+        day = e1.day
+        order, starts, nxt = day_order[day], day_starts[day], day_next[day]
+        nxt[position[i]] = position[i] + 1
+
+        members = []
+        pos = next_unused(nxt, bisect_right(starts, e1.start - day_maxdur[day]))
+        while pos < len(order) and starts[pos] < e1.end:
+            j = order[pos]
+            if items[j].end > e1.start:
+                members.append(j)
                 used[j] = True
-        course_codes = [e["courseCode"] for e in group]
-        best_code = dedup(clean_text(max(course_codes, key=score_course_code)))
-        get_common = lambda field: max(set(field), key=field.count)
-        group_field = dedup(clean_text(get_common([e["group"] for e in group])))
-        location_field = dedup(clean_text(get_common([e["location"] for e in group])))
-        weeks = sorted(set(w for e in group for w in e["weeks"]), key=week_sort_key)
-        notes = "; ".join(sorted(set(e["note"] for e in group if e["note"])))
-        merged.append({
-            "courseCode": best_code,
-            "group": group_field,
-            "location": location_field,
-            "weeks": weeks,
-            "time": e1["time"],
-            "day": e1["day"],
-            "startDate": e1["startDate"],
-            "note": notes
-        })
+                nxt[pos] = pos + 1
+            pos = next_unused(nxt, pos + 1)
+
+        members.sort()
+        merged.append(merge_group([e1] + [items[j] for j in members]).to_dict())
     return merged
 
 # === MAIN PIPELINE ===
-def extract_timetable(pdf_path: str) -> list[dict]: 
-    all_output = []
+def load_page_tokens(image, page_tokens=None):
+    """
+    Page token table: the PDF text layer when it has words, otherwise full-page OCR.
+    Returns (tokens, from_text_layer).
+    """
+    if page_tokens is not None and not page_tokens.empty:
+        tracing.count("text_layer_pages")
+        return page_tokens, True
+    return extract_ocr_df(image), False
+
+
+def extract_page_entries(page, day, ocr_df, refined, from_text_layer, options):
+    """
+    Course extraction and merging for one page (a RenderedPage) whose layout is already
+    known. With options.low_memory the image is taken out of `page` and freed once masked.
+    """
+    image = page.take_image() if options.low_memory else page.image
+    token_index = TokenIndex(ocr_df)
+
+    time_box = refined[0]
+    week_box = refined[1]
+    course_df = pd.DataFrame([refined[2]])
+
+    weeks = get_weeks(week_box)
+    time_rows = get_time_rows(time_box)
+
+    # Text-layer tokens are exact, so there is nothing to gain from re-OCR'ing a header cell
+    with tracing.span("header_dates"):
+        week_to_date_pair = extract_week_date_ranges(image, week_box, token_index, allow_ocr=not from_text_layer)
+
+    # Full-page OCR tokens are read from the unmasked page, so course blocks are still
+    # OCR'd on the cyan-masked crop; text-layer tokens are used directly
+    page_thresh = None
+    if not from_text_layer and not course_df.empty:
+        with tracing.span("threshold"):
+            page_thresh = threshold_for_ocr(image)
+    if options.low_memory:
+        image = None  # course OCR only reads the 1-byte thresholded page
+    with tracing.span("courses", day=day):
+        day_entries = extract_courses(image, course_df, weeks, time_rows, day, week_to_date_pair,
+                                      token_index if from_text_layer else None, ocr_mode=options.course_ocr,
+                                      page_thresh=page_thresh)
+    with tracing.span("merge"):
+        return merge_entries(day_entries)
+
+
+def process_page(page, day, page_tokens=None, options=None):
+    """
+    Run OCR, layout, course extraction and merging for a single day page (a RenderedPage).
+    If `page_tokens` (the PDF text layer) has words, Tesseract is skipped entirely.
+    """
+    options = options or ExtractOptions()
+    set_ocr_backend(options.ocr_backend)
+    with tracing.span("page", day=day):
+        ocr_df, from_text_layer = load_page_tokens(page.image, page_tokens)
+        refined = get_refined_layout_boxes(page.image, ocr_df, use_cache=options.layout_cache)
+        return extract_page_entries(page, day, ocr_df, refined, from_text_layer, options)
+
+
+def _process_page_traced(page, day, page_tokens=None, options=None):
+    """`process_page` in a pool worker, returning (entries, spans/counters) for the caller's tracer."""
+    tracer = tracing.Tracer(memory=bool(options and options.low_memory))
+    try:
+        with tracing.activate(tracer):
+            entries = process_page(page, day, page_tokens, options)
+    finally:
+        tracer.close()
+    return entries, tracer.export()
 
-    for idx in range(5):
-        day = DAYS[idx]
-        
-        image = convert_from_path(pdf_path, dpi=300, first_page=idx+1, last_page=idx+1)[0]
 
-        ocr_df = extract_ocr_df(image)
-        refined = get_refined_layout_boxes(image, ocr_df)
+# === PROCESS POOL ===
+_pool = None
+_pool_workers = 0
+_pool_users = {}  # pool -> extractions currently submitting to it
+_pool_lock = threading.Lock()  # sessions/service threads may ask for the pool at the same time
 
-        time_box = refined[0]
-        week_box = refined[1]
-        course_df = pd.DataFrame([refined[2]])
 
-        weeks = get_weeks(week_box)
-        time_rows = get_time_rows(time_box)
+def _init_worker(warm_up=False):
+    # Each worker handles one page at a time, so keep Tesseract/OpenCV/torch
+    # single-threaded instead of oversubscribing the cores
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    # Load the YOLO weights once for the worker's lifetime
+    from scripts.layout_detector import layout_model
+    if warm_up:
+        layout_model.warm_up()
+    else:
+        layout_model.get()
+
+
+@contextmanager
+def _use_pool(workers, warm_up=False):
+    """
+    Process pool shared across calls so workers stay warm. A caller asking for another
+    worker count gets a new pool; the old one is shut down once its last user is done.
+    """
+    global _pool, _pool_workers
+    retired = None
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None and not _pool_users.get(_pool):
+                retired = _pool  # idle; a pool still in use is shut down by its last user
+            # spawn: forking after torch/Streamlit threads have started is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(warm_up,))
+            _pool_workers = workers
+        pool = _pool
+        _pool_users[pool] = _pool_users.get(pool, 0) + 1
+    if retired is not None:
+        retired.shutdown(wait=True)
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_users[pool] -= 1
+            last = _pool_users[pool] == 0
+            if last:
+                del _pool_users[pool]
+            replaced = pool is not _pool
+        if last and replaced:
+            pool.shutdown(wait=True)
+
+
+@atexit.register
+def _shutdown_pool():
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_timetable(pdf_path: str, options: ExtractOptions = None) -> list[dict]:
+    options = options or ExtractOptions()
+    with tracing.trace(options.trace or options.low_memory, memory=options.low_memory) as tracer, \
+            tracing.span("extract_timetable"):
+        entries = _extract_timetable(pdf_path, options)
+    _check_memory_budget(tracer, options)
+    return entries
+
+
+def _check_memory_budget(tracer, options):
+    """Warn (naming the stage) when the traced peak RSS went over TIMETABLE_MEMORY_BUDGET_MB."""
+    if tracer is None or options.memory_budget_mb <= 0:
+        return
+    peak, stage = tracer.peak_rss_mb()
+    if peak is not None and peak > options.memory_budget_mb:
+        logging.warning("⚠️ Peak RSS %.0f MB in stage %r is over the %d MB memory budget",
+                        peak, stage, options.memory_budget_mb)
+
+
+def _extract_timetable(pdf_path, options):
+    # One poppler process renders all day pages; each page is discarded after use
+    source = PdfPageSource(pdf_path, dpi=options.dpi, color_mode=options.color_mode,
+                           first_page=1, last_page=len(DAYS))
+
+    # Digitally generated PDFs carry positioned text; pages without it fall back to OCR
+    text_layer = {}
+    if options.use_text_layer:
+        with tracing.span("text_layer"):
+            text_layer = extract_text_layer(pdf_path, dpi=options.dpi, first_page=1, last_page=len(DAYS))
+        logging.info("PDF text layer found on %d page(s)", sum(not df.empty for df in text_layer.values()))
+
+    if options.workers > 1:
+        # Pages are submitted as soon as they are rendered, so rendering overlaps OCR
+        tracer = tracing.current()
+        task = process_page if tracer is None else _process_page_traced
+        futures = {}
+        with _use_pool(options.workers, options.warm_up) as pool:
+            for page in source:
+                # Workers get the RenderedPage, so in low-memory mode they can free its image early.
+                # It is pickled later by the executor's thread, so it must not be modified here.
+                futures[page.index] = pool.submit(task, page, DAYS[page.index],
+                                                  text_layer.get(page.index), options)
+                pending = [f for f in futures.values() if not f.done()]
+                if options.low_memory and len(pending) >= options.workers:
+                    # Load the next page only once a worker is free, so rendered pages don't pile up in the queue
+                    wait(pending, return_when=FIRST_COMPLETED)
+            per_page = {idx: fut.result() for idx, fut in futures.items()}
+        if tracer is not None:
+            # Worker spans come back with the entries; the perf_counter clock is shared
+            for idx, (entries, exported) in per_page.items():
+                tracer.merge(exported)
+                per_page[idx] = entries
+    elif options.batch_layout and not options.low_memory:
+        # Tokens for every page first, then one batched YOLO pass for the layout-cache misses
+        set_ocr_backend(options.ocr_backend)
+        pages = list(source)
+        tokens = [load_page_tokens(page.image, text_layer.get(page.index)) for page in pages]
+        layouts = get_refined_layout_boxes_batch([page.image for page in pages], [t[0] for t in tokens],
+                                                 use_cache=options.layout_cache)
+        per_page = {page.index: extract_page_entries(page, DAYS[page.index], ocr_df, refined, from_text_layer, options)
+                    for page, (ocr_df, from_text_layer), refined in zip(pages, tokens, layouts)}
+    else:
+        # One page in memory at a time: the page image is dropped before the next one is rendered
+        per_page = {page.index: process_page(page, DAYS[page.index], text_layer.get(page.index), options)
+                    for page in source}
+
+    logging.info("Rendered %d page(s) in %.2fs: %s", len(source.page_timings), source.total_render_seconds,
+                 ", ".join(f"p{i + 1}={t:.2f}s" for i, t in sorted(source.page_timings.items())))
+
+    # Results are merged in DAYS order regardless of which worker finished first
+    all_output = []
+    for idx in sorted(per_page):
+        all_output.extend(per_page[idx])
+    return all_output
+
 
-        week_to_date_pair = extract_week_date_ranges(image, week_box)
+# === RESULT CACHE ===
+# Bump when a change to the pipeline alters its output, so stale cached results are not served
+PIPELINE_VERSION = "3"
 
-        day_entries = extract_courses(image, course_df, weeks, time_rows, day, week_to_date_pair)
-        merged_day = merge_entries(day_entries)
-        all_output.extend(merged_day)
 
-    return all_output
\ No newline at end of file
+def pipeline_version(options: ExtractOptions) -> str:
+    """Everything besides the PDF bytes that determines the extracted entries."""
+    model_path = LAYOUT_BACKENDS[LAYOUT_BACKEND]
+    try:
+        st = os.stat(model_path)
+        model_version = f"{os.path.basename(model_path)}:{st.st_size}:{int(st.st_mtime)}"
+    except OSError:
+        model_version = os.path.basename(model_path)
+    # "auto" means whichever engine is installed here, and the two give different tokens
+    ocr_backend = get_ocr_backend(options.ocr_backend).name
+    return ":".join(str(v) for v in (
+        PIPELINE_VERSION, LAYOUT_BACKEND, LAYOUT_IMGSZ, model_version, options.layout_cache,
+        options.dpi, options.color_mode, options.use_text_layer, options.course_ocr, ocr_backend,
+        get_holiday_matcher().version,
+    ))
+
+
+def extract_timetable_cached(pdf_path: str, options: ExtractOptions = None, cache=None) -> list[dict]:
+    """
+    `extract_timetable` behind the content-addressed result cache: a PDF that was
+    already extracted with the same pipeline/model version is answered from disk.
+    """
+    options = options or ExtractOptions()
+    if not options.result_cache:
+        return extract_timetable(pdf_path, options)
+
+    with tracing.trace(options.trace, memory=options.low_memory):
+        cache = cache or get_result_cache()
+        with tracing.span("result_cache"):
+            key = cache.make_key(file_sha256(pdf_path), pipeline_version(options))
+            cached = cache.get(key)
+        if cached is not None:
+            logging.info("Result cache hit for %s", pdf_path)
+            tracing.count("result_cache_hits")
+            return cached
+
+        entries = extract_timetable(pdf_path, options)
+        cache.put(key, entries)
+        return entries
@@ -1,42 +1,83 @@
 # For troubleshooting if ICS is generated correctly
+# Reads the .ics written by scripts/utils/ics_writer.py (one VEVENT per block of
+# consecutive weeks, repeated with RRULE:FREQ=WEEKLY;COUNT=n) and lists every class.
 
-from ics import Calendar
+import re
+from datetime import datetime, timedelta
 from dateutil import tz
-from datetime import timedelta
 import pandas as pd
 
+
+def unfold(text):
+    """RFC 5545 content lines with folded continuation lines joined back."""
+    return re.sub(r"\r?\n[ \t]", "", text).splitlines()
+
+
+def unescape(value):
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def parse_time(value, local_tz):
+    """Wall time of a DTSTART/DTEND value in the timetable's zone; UTC ("...Z") values are converted."""
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=tz.UTC).astimezone(local_tz).replace(tzinfo=None)
+    return dt
+
+
+def read_events(text):
+    events, event = [], None
+    for line in unfold(text):
+        if line == "BEGIN:VEVENT":
+            event = {}
+        elif line == "END:VEVENT":
+            events.append(event)
+            event = None
+        elif event is not None and ":" in line:
+            name, value = line.split(":", 1)
+            event[name.split(";", 1)[0]] = value
+    return events
+
+
 # Load your .ics file
 with open("./timetable.ics", "r", encoding="utf-8") as f:
-    cal = Calendar(f.read())
+    text = f.read()
+events = read_events(text)
 
-sgt = tz.gettz("Asia/Singapore")
+# Times with a TZID are already local; the calendar's VTIMEZONE names that zone
+tzid = re.search(r"^TZID:(.+)$", text, re.M)
+local_tz = tz.gettz(tzid.group(1).strip() if tzid else "Asia/Singapore")
 
 events_list = []
-for event in cal.events:
-    dt_start = event.begin.datetime.astimezone(sgt)
-    dt_end = event.end.datetime.astimezone(sgt)
+for event in events:
+    dt_start = parse_time(event["DTSTART"], local_tz)
+    dt_end = parse_time(event["DTEND"], local_tz)
+    count = re.search(r"COUNT=(\d+)", event.get("RRULE", ""))
+    repeats = int(count.group(1)) if count else 1
 
-    name = event.name.strip()
+    name = unescape(event.get("SUMMARY", "")).strip()
     course_code = name.split("(", 1)[0].strip()
     group = name.split("(")[1].replace(")", "").strip() if "(" in name else ""
 
-    desc_lines = event.description.splitlines() if event.description else []
+    desc_lines = unescape(event.get("DESCRIPTION", "")).splitlines()
     weeks_line = next((line for line in desc_lines if line.lower().startswith("weeks")), "")
     note_line = next((line for line in desc_lines if "note" in line.lower()), "")
     weeks = [w.strip() for w in weeks_line.split(":", 1)[1].split(",")] if ":" in weeks_line else None
     note = note_line.split(":", 1)[1].strip() if ":" in note_line else None
 
-    events_list.append({
-        "date": dt_start.strftime("%Y-%m-%d"),
-        "day": dt_start.strftime("%A"),
-        "start": dt_start.strftime("%H:%M"),
-        "end": dt_end.strftime("%H:%M"),
-        "courseCode": course_code,
-        "group": group,
-        "location": event.location,
-        "note": note,
-        "weeks": ", ".join(weeks) if weeks else None
-    })
+    for i in range(repeats):
+        start = dt_start + timedelta(weeks=i)
+        events_list.append({
+            "date": start.strftime("%Y-%m-%d"),
+            "day": start.strftime("%A"),
+            "start": start.strftime("%H:%M"),
+            "end": (dt_end + timedelta(weeks=i)).strftime("%H:%M"),
+            "courseCode": course_code,
+            "group": group,
+            "location": unescape(event.get("LOCATION", "")) or None,
+            "note": note,
+            "weeks": ", ".join(weeks) if weeks else None
+        })
 
 # Create sorted DataFrame
 df = pd.DataFrame(events_list)
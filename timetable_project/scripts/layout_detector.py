@@ -1,56 +1,122 @@
 # layout_detector.py
 import os
+import threading
 import pandas as pd
 import numpy as np
 from PIL import Image
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 from scripts.utils.ocr_utils import clean_text
-from ultralytics import YOLO
+from scripts.utils.model_manager import ModelManager
+from scripts.utils.line_grouping import gap_slices
+from scripts.utils.layout_cache import get_layout_cache, page_fingerprint
+from scripts.utils import tracing
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, "../yolov8/runs/detect/train_3_class/weights/best.pt")
-model = YOLO(MODEL_PATH)
+WEIGHTS_DIR = os.path.join(BASE_DIR, "../yolov8/runs/detect/train_3_class/weights")
+MODEL_PATH = os.path.join(WEIGHTS_DIR, "best.pt")
 
-def run_yolo_detection(image: Image.Image):
-    img_array = np.array(image.convert("RGB"))
-    results = model(img_array)
+# Exported variants are produced by yolov8/export_model.py; ultralytics loads all of them
+LAYOUT_BACKENDS = {
+    "torch": MODEL_PATH,
+    "onnx": os.path.join(WEIGHTS_DIR, "best.onnx"),
+    "openvino": os.path.join(WEIGHTS_DIR, "best_openvino_model"),
+    "openvino_int8": os.path.join(WEIGHTS_DIR, "best_int8_openvino_model"),
+}
+LAYOUT_BACKEND = os.environ.get("TIMETABLE_LAYOUT_BACKEND", "torch")
+LAYOUT_IMGSZ = int(os.environ.get("TIMETABLE_LAYOUT_IMGSZ", "1280"))  # training size, see yolov8/yolo_train.py
+LAYOUT_BATCH = int(os.environ.get("TIMETABLE_LAYOUT_BATCH", "8"))
+
+_layout_models = {}
+_layout_models_lock = threading.Lock()
+
+# OCR readings of the "Week" header label
+WEEK_LABEL_VARIANTS = ["WEEK", "VEEK", "EEK", "EKS"]
+
+
+def get_layout_model(backend=None):
+    """One shared, lazily loaded ModelManager per backend."""
+    backend = backend or LAYOUT_BACKEND
+    if backend not in LAYOUT_BACKENDS:
+        raise ValueError(f"Unknown layout backend {backend!r}, expected one of {list(LAYOUT_BACKENDS)}")
+    # Under the lock, so threads racing on first use share one manager (and one load of the weights)
+    with _layout_models_lock:
+        if backend not in _layout_models:
+            path = LAYOUT_BACKENDS[backend]
+            _layout_models[backend] = ModelManager(path, pool_size=int(os.environ.get("TIMETABLE_YOLO_POOL", "1")))
+        return _layout_models[backend]
+
+
+# Loaded on first use and shared by every session/thread in this process
+layout_model = get_layout_model()
+
+
+def prepare_layout_input(image: Image.Image, imgsz=LAYOUT_IMGSZ):
+    """
+    Downscale the page once so its long side matches the model input size.
+    Returns (RGB array, scale); divide detected coordinates by `scale`.
+    """
+    w, h = image.size
+    scale = min(1.0, imgsz / max(w, h))
+    if scale < 1.0:
+        image = image.resize((round(w * scale), round(h * scale)), Image.BILINEAR, reducing_gap=2.0)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image), scale
+
+
+def _boxes_to_df(result, scale):
     boxes = []
-    for box in results[0].boxes:
+    for box in result.boxes:
         cls = int(box.cls[0])
-        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        x1, y1, x2, y2 = (v / scale for v in box.xyxy[0].tolist())
         boxes.append({
             "class": cls,
             "x1": x1, "x2": x2,
             "y1": y1, "y2": y2
         })
-    return pd.DataFrame(boxes)
+    return pd.DataFrame(boxes, columns=["class", "x1", "x2", "y1", "y2"])
+
+
+def run_yolo_detection(image: Image.Image, backend=None, imgsz=LAYOUT_IMGSZ):
+    with tracing.span("yolo", pages=1):
+        img_array, scale = prepare_layout_input(image, imgsz)
+        results = get_layout_model(backend).predict(img_array, imgsz=imgsz, verbose=False)
+        return _boxes_to_df(results[0], scale)
+
+
+def run_yolo_detection_batch(images, backend=None, imgsz=LAYOUT_IMGSZ, batch_size=LAYOUT_BATCH):
+    """
+    Detect layout boxes on many pages (one document or several) with batched
+    forward passes of up to `batch_size` pages. Returns one DataFrame per image, in order.
+    """
+    manager = get_layout_model(backend)
+    box_dfs = []
+    for start in range(0, len(images), batch_size):
+        with tracing.span("yolo", pages=len(images[start:start + batch_size])):
+            prepared = [prepare_layout_input(img, imgsz) for img in images[start:start + batch_size]]
+            results = manager.predict([arr for arr, _ in prepared], imgsz=imgsz, verbose=False)
+            box_dfs.extend(_boxes_to_df(res, scale) for res, (_, scale) in zip(results, prepared))
+    return box_dfs
 
 def refine_yolo_boxes_with_fallback(box_df, ocr_df, ocr_line_gap=10):
     refined = {}
 
-    # Group OCR lines
-    ocr_df_sorted = ocr_df.sort_values("y1")
-    grouped_lines = []
-    current_line = []
-    last_y = None
-    for _, row in ocr_df_sorted.iterrows():
-        if last_y is None or abs(row["y1"] - last_y) <= ocr_line_gap:
-            current_line.append(row)
-        else:
-            grouped_lines.append(current_line)
-            current_line = [row]
-        last_y = row["y1"]
-    if current_line:
-        grouped_lines.append(current_line)
+    # Clean every token once; both the line grouping and the WEEK search reuse it
+    texts = [clean_text(t) for t in ocr_df["text"]]
+
+    # Group OCR lines: sort by y1 and start a new line wherever the gap exceeds ocr_line_gap
+    pos = np.argsort(ocr_df["y1"].to_numpy(), kind="quicksort")  # same order as sort_values("y1")
+    y1_sorted = ocr_df["y1"].to_numpy(dtype=float)[pos]
+    y2_sorted = ocr_df["y2"].to_numpy(dtype=float)[pos]
+    line_slices = gap_slices(y1_sorted, ocr_line_gap)
+    line_text = [" ".join(texts[p] for p in pos[a:b]) for a, b in line_slices]
+    line_y1 = [y1_sorted[a:b].min() for a, b in line_slices]
+    line_y2 = [y2_sorted[a:b].max() for a, b in line_slices]
 
     def find_line_pair(start_str, end_str):
-        for i in range(len(grouped_lines) - 1):
-            line1 = " ".join(clean_text(w["text"]) for w in grouped_lines[i])
-            line2 = " ".join(clean_text(w["text"]) for w in grouped_lines[i + 1])
-            if start_str in line1 and end_str in line2:
-                y1 = min(w["y1"] for w in grouped_lines[i])
-                y2 = max(w["y2"] for w in grouped_lines[i + 1])
-                return y1, y2
+        for i in range(len(line_text) - 1):
+            if start_str in line_text[i] and end_str in line_text[i + 1]:
+                return line_y1[i], line_y2[i + 1]
         return None, None
 
     # === Week (class 1) ===
@@ -58,13 +124,18 @@ def refine_yolo_boxes_with_fallback(box_df, ocr_df, ocr_line_gap=10):
     if week_boxes.empty:
         return refined
     wk = week_boxes.iloc[0].copy()
-    for _, row in ocr_df.iterrows():
-        txt = clean_text(row["text"])
-        if any(fuzz.partial_ratio(txt, key) > 80 for key in ["WEEK", "VEEK", "EEK", "EKS"]):
-            if row["x1"] < wk["x1"]:
-                wk["x1"] = row["x1"] - 30
-        if "13" in txt and row["x2"] > wk["x2"]:
-            wk["x2"] = row["x2"] + 60
+    x1s = ocr_df["x1"].to_numpy()
+    x2s = ocr_df["x2"].to_numpy()
+    # Score every token against all WEEK variants in one call; only the (few) matches
+    # are then applied in page order, because each update moves the threshold for the next
+    if texts:
+        scores = process.cdist(texts, WEEK_LABEL_VARIANTS, scorer=fuzz.partial_ratio)
+        for r in np.flatnonzero((scores > 80).any(axis=1)):
+            if x1s[r] < wk["x1"]:
+                wk["x1"] = x1s[r] - 30
+    for r in (i for i, t in enumerate(texts) if "13" in t):
+        if x2s[r] > wk["x2"]:
+            wk["x2"] = x2s[r] + 60
     refined[1] = wk
 
     # === TimeSlot (class 0) ===
@@ -102,11 +173,36 @@ def refine_yolo_boxes_with_fallback(box_df, ocr_df, ocr_line_gap=10):
 
     return refined
 
-def get_refined_layout_boxes(image: Image.Image, ocr_df: pd.DataFrame) -> dict:
+def get_refined_layout_boxes(image: Image.Image, ocr_df: pd.DataFrame, use_cache=False) -> dict:
     """
     Given a PIL image, returns refined bounding boxes for layout classes.
     Output: { class_id: {x1, y1, x2, y2}, ... }
+    With use_cache, a known page format is answered from the layout cache without YOLO.
     """
+    return get_refined_layout_boxes_batch([image], [ocr_df], use_cache=use_cache)[0]
 
-    box_df = run_yolo_detection(image)
-    return refine_yolo_boxes_with_fallback(box_df, ocr_df)
+
+def get_refined_layout_boxes_batch(images, ocr_dfs, use_cache=False) -> list:
+    """
+    Batched version of `get_refined_layout_boxes`: one detector pass for all pages
+    that miss the layout cache, then the usual OCR-based refinement per page.
+    """
+    cache = get_layout_cache() if use_cache else None
+    with tracing.span("layout_cache"):
+        fingerprints = [page_fingerprint(img) for img in images] if cache else [None] * len(images)
+        refined = [cache.get(fp, ocr_df) if cache else None for fp, ocr_df in zip(fingerprints, ocr_dfs)]
+
+    misses = [i for i, r in enumerate(refined) if r is None]
+    if cache:
+        tracing.count("layout_cache_hits", len(images) - len(misses))
+    if misses:
+        if len(misses) == 1:
+            box_dfs = [run_yolo_detection(images[misses[0]])]
+        else:
+            box_dfs = run_yolo_detection_batch([images[i] for i in misses])
+        for i, box_df in zip(misses, box_dfs):
+            with tracing.span("refine"):
+                refined[i] = refine_yolo_boxes_with_fallback(box_df, ocr_dfs[i])
+            if cache:
+                cache.put(fingerprints[i], refined[i])
+    return refined
@@ -0,0 +1,139 @@
+# scripts/utils/course_entry.py
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from scripts.utils.constants import WEEKS
+
+WEEK_BITS = {w: 1 << i for i, w in enumerate(WEEKS)}
+FIELD_KEYS = ("courseCode", "group", "location", "weeks", "time", "day", "startDate", "note")
+_FIELD_SET = frozenset(FIELD_KEYS)
+
+
+def weeks_to_mask(weeks):
+    """Week labels -> bit mask over WEEKS (bit i = WEEKS[i]). Returns None if a label is unknown."""
+    mask = 0
+    for w in weeks:
+        bit = WEEK_BITS.get(w)
+        if bit is None:
+            return None
+        mask |= bit
+    return mask
+
+
+def mask_to_weeks(mask):
+    """Bit mask -> week labels in calendar order (Recess between 7 and 8)."""
+    return [w for i, w in enumerate(WEEKS) if mask >> i & 1]
+
+
+@lru_cache(maxsize=4096)
+def parse_time_range(time):
+    """'HHMM-HHMM' -> (start, end) minutes since midnight, or None if it is not in that form."""
+    try:
+        s, e = time.split("-")
+        if len(s) != 4 or len(e) != 4:
+            return None
+        return int(s[:2]) * 60 + int(s[2:]), int(e[:2]) * 60 + int(e[2:])
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_time_range(start, end):
+    return f"{start // 60:02d}{start % 60:02d}-{end // 60:02d}{end % 60:02d}"
+
+
+@lru_cache(maxsize=4096)
+def _encode_weeks(weeks):
+    """tuple of labels -> (mask, labels to keep verbatim or None when the mask reproduces them)."""
+    mask = weeks_to_mask(weeks)
+    if mask is None:
+        return 0, weeks
+    if mask_to_weeks(mask) != list(weeks):
+        return mask, weeks
+    return mask, None
+
+
+@lru_cache(maxsize=4096)
+def _encode_time(time):
+    """time string -> (start, end, string to keep verbatim or None when it round-trips)."""
+    span = parse_time_range(time)
+    if span is None:
+        return -1, -1, time
+    return span[0], span[1], None if format_time_range(*span) == time else time
+
+
+@dataclass(slots=True)
+class CourseEntry:
+    """
+    One course block, with weeks as a 14-bit mask over WEEKS and times in minutes.
+
+    `from_dict`/`to_dict` convert to and from the JSON shape used everywhere else
+    ({"courseCode", "group", "location", "weeks", "time", "day", "startDate", "note"}).
+    The conversion is lossless: week lists that are not in calendar order (or hold
+    unknown labels) and unparseable times are kept verbatim, and any other keys
+    (e.g. the editor's "id") ride along in `extra`.
+    """
+    course_code: str = ""
+    group: str = ""
+    location: str = ""
+    week_mask: int = 0
+    start: int = -1
+    end: int = -1
+    day: str = ""
+    start_date: object = ""  # "DD Mon YY", "UNKNOWN", or a date picked in the editor
+    note: str = ""
+    raw_weeks: tuple = None
+    raw_time: str = None
+    extra: dict = None
+
+    @classmethod
+    def from_dict(cls, d):
+        mask, raw_weeks = _encode_weeks(tuple(d.get("weeks", ())))
+        start, end, raw_time = _encode_time(d.get("time", ""))
+        extra = None if d.keys() <= _FIELD_SET else {k: v for k, v in d.items() if k not in _FIELD_SET}
+
+        return cls(
+            course_code=d.get("courseCode", ""),
+            group=d.get("group", ""),
+            location=d.get("location", ""),
+            week_mask=mask,
+            start=start,
+            end=end,
+            day=d.get("day", ""),
+            start_date=d.get("startDate", ""),
+            note=d.get("note", ""),
+            raw_weeks=raw_weeks,
+            raw_time=raw_time,
+            extra=extra,
+        )
+
+    @property
+    def weeks(self):
+        return list(self.raw_weeks) if self.raw_weeks is not None else mask_to_weeks(self.week_mask)
+
+    @property
+    def time(self):
+        return self.raw_time if self.raw_time is not None else format_time_range(self.start, self.end)
+
+    @property
+    def has_time(self):
+        return self.start >= 0 and self.end >= 0
+
+    def overlaps(self, other):
+        """Same day and overlapping [start, end) times."""
+        return self.day == other.day and not (self.end <= other.start or other.end <= self.start)
+
+    def to_dict(self):
+        d = {
+            "courseCode": self.course_code,
+            "group": self.group,
+            "location": self.location,
+            "weeks": self.weeks,
+            "time": self.time,
+            "day": self.day,
+            "startDate": self.start_date,
+            "note": self.note,
+        }
+        if self.extra:
+            d.update(self.extra)
+        return d
@@ -0,0 +1,106 @@
+# scripts/utils/holiday_matcher.py
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from rapidfuzz import process, fuzz
+
+from scripts.utils.constants import KNOWN_HOLIDAYS
+
+
+class HolidayMatcher:
+    """
+    Fuzzy holiday lookup for the lines of a course column.
+
+    `match_lines` scores every single line and every adjacent pair of lines in one
+    `cdist` call, and remembers results so repeated OCR strings are never rescored.
+    """
+
+    def __init__(self, holidays=KNOWN_HOLIDAYS, threshold=80, memo_size=4096):
+        self.holidays = list(dict.fromkeys(h.lower().strip() for h in holidays if h.strip()))
+        self.names = set(self.holidays)
+        self.threshold = threshold
+        self.memo_size = memo_size
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Short fingerprint of the holiday list, for cache keys."""
+        return hashlib.sha256("\n".join(self.holidays).encode()).hexdigest()[:12]
+
+    def is_holiday_name(self, line):
+        """Exact (case-insensitive) holiday name, used to skip holiday lines before a course block."""
+        return line.lower() in self.names
+
+    def _score(self, queries):
+        # Memo hits are copied out here, so a later clear (here or in another thread) can't lose them
+        with self._lock:
+            known = {q: self._memo[q] for q in queries if q in self._memo}
+        todo = list(dict.fromkeys(q for q in queries if q not in known))
+        if todo and self.holidays:
+            scores = process.cdist(todo, self.holidays, scorer=fuzz.token_sort_ratio)
+            best = scores.argmax(axis=1)  # first best, like process.extractOne
+            results = {
+                q: self.holidays[b].upper() if scores[r, b] >= self.threshold else None
+                for r, (q, b) in enumerate(zip(todo, best))
+            }
+        else:
+            results = {q: None for q in todo}
+        with self._lock:
+            if len(self._memo) + len(results) > self.memo_size:
+                self._memo.clear()
+            self._memo.update(results)
+        known.update(results)
+        return [known[q] for q in queries]
+
+    def match(self, lines):
+        """Holiday name (upper case) for the joined lines, or None."""
+        return self._score([" ".join(lines).lower().strip()])[0]
+
+    def match_lines(self, lines):
+        """
+        For already-cleaned lines, return (single, pair): single[i] matches line i
+        alone and pair[i] matches lines i and i+1 joined (line i alone for the last).
+        """
+        n = len(lines)
+        singles = [line.lower().strip() for line in lines]
+        pairs = [" ".join([lines[i], lines[i + 1] if i + 1 < n else ""]).lower().strip() for i in range(n)]
+        scored = self._score(singles + pairs)
+        return scored[:n], scored[n:]
+
+
+def load_holidays(path):
+    """
+    Read an institution's holiday names from JSON: either a list of names or
+    {"holidays": [...], "replace_defaults": false}. Names are added to KNOWN_HOLIDAYS
+    unless replace_defaults is true.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return list(KNOWN_HOLIDAYS) + data
+    names = data.get("holidays", [])
+    return names if data.get("replace_defaults") else list(KNOWN_HOLIDAYS) + names
+
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_holiday_matcher():
+    """Shared matcher for this process; TIMETABLE_HOLIDAYS_FILE adds institution-specific holidays."""
+    path = os.environ.get("TIMETABLE_HOLIDAYS_FILE") or None
+    with _matchers_lock:
+        if path not in _matchers:
+            holidays = KNOWN_HOLIDAYS
+            if path:
+                try:
+                    holidays = load_holidays(path)
+                except (OSError, ValueError) as e:
+                    logging.warning("Could not load holidays from %s, using defaults: %s", path, e)
+            _matchers[path] = HolidayMatcher(holidays)
+        return _matchers[path]
@@ -0,0 +1,208 @@
+# scripts/utils/ics_writer.py
+
+import io
+import uuid
+from collections import namedtuple
+from datetime import datetime, date, timedelta, timezone as dt_timezone
+
+import pytz
+
+from scripts.utils.constants import WEEKS
+from scripts.utils.course_entry import CourseEntry
+from scripts.utils import tracing
+
+PRODID = "-//fyp-timetable-extraction//Timetable to ICS//EN"
+DEFAULT_TIMEZONE = "Asia/Singapore"
+
+# One weekly-recurring event: start/end are naive local times of the first session
+Session = namedtuple("Session", "start end summary location description count")
+
+
+def get_week_index(w):
+    return WEEKS.index(w) if w in WEEKS else -1
+
+
+def split_weeks_into_blocks(weeks):
+    blocks = []
+    current = []
+    prev_index = None
+
+    for w in weeks:
+        if w == "Recess":
+            if current:
+                blocks.append(current)
+                current = []
+            prev_index = None
+            continue
+
+        idx = get_week_index(w)
+        if prev_index is not None and idx != prev_index + 1:
+            blocks.append(current)
+            current = []
+        current.append(w)
+        prev_index = idx
+
+    if current:
+        blocks.append(current)
+
+    return blocks
+
+
+def course_sessions(courses):
+    """
+    Expand courses into one Session per block of consecutive weeks (a Recess week
+    or a gap starts a new block), sorted by start time and name.
+    Returns (sessions, errors); a course with an error contributes no sessions.
+    """
+    sessions = []
+    errors = []
+
+    for idx, entry in enumerate(courses):
+        try:
+            raw_date = entry.get("startDate")
+            if isinstance(raw_date, str):
+                if raw_date.upper() == "UNKNOWN":
+                    raise ValueError("Missing startDate")
+                start_date = datetime.strptime(raw_date, "%d %b %y").date()
+            elif isinstance(raw_date, date):
+                start_date = raw_date
+            else:
+                raise ValueError("Invalid startDate type")
+
+            course = CourseEntry.from_dict(entry)
+            if not course.has_time:
+                raise ValueError(f"Invalid time '{entry.get('time', '')}'")
+            start_h, start_m = divmod(course.start, 60)
+            end_h, end_m = divmod(course.end, 60)
+
+            course_weeks = course.weeks
+            course_first_week_index = get_week_index(course_weeks[0])
+
+            summary = f"{entry['courseCode']} ({entry['group']})"
+            course_sessions_ = []
+            for block in split_weeks_into_blocks(course_weeks):
+                week_diff = get_week_index(block[0]) - course_first_week_index
+
+                # ✅ Adjust only by week_diff to preserve original weekday
+                session_date = start_date + timedelta(weeks=week_diff)
+                day_start = datetime(session_date.year, session_date.month, session_date.day)
+
+                description = f"Weeks: {', '.join(block)}"
+                if entry.get("note"):
+                    description += f"\nNote: {entry['note']}"
+
+                course_sessions_.append(Session(
+                    start=day_start.replace(hour=start_h, minute=start_m),
+                    end=day_start.replace(hour=end_h, minute=end_m),
+                    summary=summary,
+                    location=entry["location"],
+                    description=description,
+                    count=len(block),
+                ))
+            sessions.extend(course_sessions_)
+
+        except Exception as e:
+            errors.append(f"Error in Course {idx + 1}: {e}")
+
+    sessions.sort(key=lambda s: (s.start, s.summary))
+    return sessions, errors
+
+
+def _escape(text):
+    """RFC 5545 TEXT escaping."""
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """Encode one content line, folded at 75 octets without splitting UTF-8 sequences."""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return data + b"\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, 74  # continuation lines begin with a space
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _fixed_offset(tz, sessions):
+    """
+    The zone's UTC offset if it is the same across every year the sessions touch
+    (true for Asia/Singapore), else None. Checked at a few dates per year rather
+    than per event.
+    """
+    if not sessions:
+        return tz.utcoffset(datetime(2000, 1, 1)), tz.tzname(datetime(2000, 1, 1))
+    years = range(min(s.start.year for s in sessions), max(s.start.year for s in sessions) + 2)
+    probes = [datetime(y, m, 1) for y in years for m in (1, 4, 7, 10)]
+    offsets = {(tz.utcoffset(p), tz.tzname(p)) for p in probes}
+    return offsets.pop() if len(offsets) == 1 else None
+
+
+def _format_offset(offset):
+    minutes = int(offset.total_seconds() // 60)
+    sign = "+" if minutes >= 0 else "-"
+    return f"{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}"
+
+
+def write_ics(courses, out, timezone=DEFAULT_TIMEZONE):
+    """
+    Write courses as an iCalendar (RFC 5545) stream into the binary file `out`.
+
+    Times are local wall-clock times with TZID and a single VTIMEZONE block. Zones
+    whose offset changes within the timetable's years fall back to UTC times, which
+    is what the `ics` library path produced. Returns the list of per-course errors.
+    """
+    sessions, errors = course_sessions(courses)
+    tz = pytz.timezone(timezone)
+    fixed = _fixed_offset(tz, sessions)
+    dtstamp = datetime.now(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    write = out.write
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"):
+        write(_fold(line))
+
+    if fixed is not None:
+        offset, tzname = fixed
+        offset_str = _format_offset(offset)
+        for line in ("BEGIN:VTIMEZONE", f"TZID:{timezone}", "BEGIN:STANDARD", "DTSTART:19700101T000000",
+                     f"TZOFFSETFROM:{offset_str}", f"TZOFFSETTO:{offset_str}", f"TZNAME:{tzname}",
+                     "END:STANDARD", "END:VTIMEZONE"):
+            write(_fold(line))
+
+        def fmt(name, dt):
+            return f"{name};TZID={timezone}:{dt.strftime('%Y%m%dT%H%M%S')}"
+    else:
+        def fmt(name, dt):
+            return f"{name}:{tz.localize(dt).astimezone(pytz.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+    for s in sessions:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{uuid.uuid4()}",
+            f"DTSTAMP:{dtstamp}",
+            fmt("DTSTART", s.start),
+            fmt("DTEND", s.end),
+            f"RRULE:FREQ=WEEKLY;COUNT={s.count}",
+            f"SUMMARY:{_escape(s.summary)}",
+        ]
+        if s.location:
+            lines.append(f"LOCATION:{_escape(s.location)}")
+        lines.append(f"DESCRIPTION:{_escape(s.description)}")
+        lines.append("END:VEVENT")
+        write(b"".join(_fold(line) for line in lines))
+
+    write(_fold("END:VCALENDAR"))
+    return errors
+
+
+def generate_ics_bytes(courses, timezone=DEFAULT_TIMEZONE):
+    """In-memory .ics for st.download_button and the service. Returns (bytes, errors)."""
+    buf = io.BytesIO()
+    with tracing.span("ics", courses=len(courses)):
+        errors = write_ics(courses, buf, timezone)
+    return buf.getvalue(), errors
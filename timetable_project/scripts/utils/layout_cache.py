@@ -0,0 +1,160 @@
+# scripts/utils/layout_cache.py
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+from rapidfuzz import fuzz
+
+from scripts.utils.ocr_utils import clean_text
+
+BOX_KEYS = ("x1", "y1", "x2", "y2")
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "timetable_extraction", "layout_cache.json")
+
+
+def page_fingerprint(image: Image.Image, header_ratio=0.25):
+    """
+    Cheap page signature: (width, height, 64-bit difference hash of the header band).
+    The header holds the week row and the top of the time column, which is the same
+    on every page of a given timetable format.
+    """
+    w, h = image.size
+    band = (0, 0, w, max(1, int(h * header_ratio)))
+    small = image.resize((9, 8), Image.BILINEAR, box=band, reducing_gap=2.0).convert("L")
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).flatten()
+    return w, h, int("".join("1" if b else "0" for b in bits), 2)
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def anchors_match(refined, ocr_df, tolerance=60):
+    """
+    Check a cached layout against this page's tokens: "0830" must sit at the top of
+    the time column and a "WEEK" label at the left end of the week row.
+    """
+    ts, wk = refined[0], refined[1]
+    texts = ocr_df["text"].astype(str).map(clean_text)
+    xc, yc = ocr_df["xc"], ocr_df["yc"]
+
+    near_time_top = (
+        texts.str.contains("0830", regex=False)
+        & (xc >= ts["x1"] - tolerance) & (xc <= ts["x2"] + tolerance)
+        & (yc >= ts["y1"] - tolerance) & (yc <= ts["y1"] + 3 * tolerance)
+    )
+    if not near_time_top.any():
+        return False
+
+    col_width = (wk["x2"] - wk["x1"]) / 15
+    in_week_cell = (
+        (xc >= wk["x1"] - tolerance) & (xc <= wk["x1"] + col_width + tolerance)
+        & (yc >= wk["y1"] - tolerance) & (yc <= wk["y2"] + tolerance)
+    )
+    return any(fuzz.partial_ratio(t, "WEEK") > 80 for t in texts[in_week_cell])
+
+
+class LayoutCache:
+    """
+    LRU cache of refined layout boxes keyed by page fingerprint, persisted as JSON.
+    A lookup hits when a stored page of the same size has a header hash within
+    `max_distance` bits and its anchor tokens are found on the new page.
+    """
+
+    def __init__(self, path=None, max_entries=64, max_distance=6):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # "w:h:hash" -> {"size": [w, h], "hash": int, "boxes": {...}}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    self._entries[self._key(entry["size"][0], entry["size"][1], entry["hash"])] = entry
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Ignoring unreadable layout cache %s: %s", self.path, e)
+
+    def _save(self):
+        # caller holds self._lock; write-then-rename so readers never see a partial file
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(list(self._entries.values()), f)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def _key(w, h, hsh):
+        return f"{w}:{h}:{hsh}"
+
+    def get(self, fingerprint, ocr_df):
+        w, h, hsh = fingerprint
+        with self._lock:
+            best_key, best_dist = None, None
+            for key, entry in self._entries.items():
+                if entry["size"] != [w, h]:
+                    continue
+                dist = _hamming(entry["hash"], hsh)
+                if dist <= self.max_distance and (best_dist is None or dist < best_dist):
+                    best_key, best_dist = key, dist
+            if best_key is None:
+                self.misses += 1
+                return None
+            refined = {int(cls): dict(box) for cls, box in self._entries[best_key]["boxes"].items()}
+
+        if not anchors_match(refined, ocr_df):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            if best_key in self._entries:
+                self._entries.move_to_end(best_key)
+            self.hits += 1
+        return refined
+
+    def put(self, fingerprint, refined):
+        if not all(cls in refined and all(k in refined[cls] for k in BOX_KEYS) for cls in (0, 1, 2)):
+            return  # incomplete layouts are never reused
+        w, h, hsh = fingerprint
+        boxes = {str(cls): {k: float(refined[cls][k]) for k in BOX_KEYS} for cls in (0, 1, 2)}
+        with self._lock:
+            key = self._key(w, h, hsh)
+            self._entries[key] = {"size": [w, h], "hash": hsh, "boxes": boxes}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            try:
+                self._save()
+            except OSError as e:
+                logging.warning("Could not persist layout cache: %s", e)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "path": self.path}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_layout_cache():
+    """Process-wide cache; TIMETABLE_LAYOUT_CACHE sets the file ("" keeps it in memory only)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.environ.get("TIMETABLE_LAYOUT_CACHE", DEFAULT_CACHE_PATH) or None
+            max_entries = int(os.environ.get("TIMETABLE_LAYOUT_CACHE_SIZE", "64"))
+            _cache = LayoutCache(path, max_entries=max_entries)
+        return _cache
@@ -0,0 +1,39 @@
+# scripts/utils/line_grouping.py
+
+import numpy as np
+
+
+def gap_slices(sorted_values, gap):
+    """
+    Split already-sorted 1-D values into runs wherever consecutive values differ by
+    more than `gap`. Returns a list of (start, end) slice bounds.
+    """
+    sorted_values = np.asarray(sorted_values, dtype=float)
+    if sorted_values.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(sorted_values) > gap) + 1
+    return list(zip(np.r_[0, breaks].tolist(), np.r_[breaks, sorted_values.size].tolist()))
+
+
+def group_lines_1d(values, gap):
+    """
+    Cluster 1-D coordinates (e.g. token `yc`) into text lines.
+
+    Gives the same labels as `DBSCAN(eps=gap, min_samples=1).fit(values.reshape(-1, 1))`:
+    on a line, two points share a cluster iff every sorted neighbour step between them
+    is <= gap, and labels are numbered in order of first appearance. Runs in
+    O(n log n) without building an estimator.
+    """
+    values = np.asarray(values, dtype=float).ravel()
+    n = values.size
+    if n == 0:
+        return np.empty(0, dtype=int)
+    order = np.argsort(values, kind="mergesort")
+    sorted_ids = np.r_[0, np.cumsum(np.diff(values[order]) > gap)]
+    raw = np.empty(n, dtype=int)
+    raw[order] = sorted_ids
+    # Renumber clusters by the index of their first member
+    _, first_seen = np.unique(raw, return_index=True)
+    renumber = np.empty(first_seen.size, dtype=int)
+    renumber[np.argsort(first_seen, kind="mergesort")] = np.arange(first_seen.size)
+    return renumber[raw]
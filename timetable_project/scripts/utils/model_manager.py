@@ -0,0 +1,94 @@
+# scripts/utils/model_manager.py
+
+import time
+import queue
+import logging
+import threading
+
+import numpy as np
+
+
+class ModelManager:
+    """
+    Process-wide owner of a detection model.
+
+    - Loads on first use (importing the module is free)
+    - Shared by every caller in the process: Streamlit sessions, reruns and worker threads
+    - Inference borrows an instance from a small pool, so concurrent callers never
+      share a predictor; with pool_size=1 inference is simply serialized
+    - Records load and warm-up times
+    """
+
+    def __init__(self, model_path, loader=None, pool_size=1):
+        self.model_path = model_path
+        self.pool_size = max(1, pool_size)
+        self._loader = loader or self._load_yolo
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    @staticmethod
+    def _load_yolo(path):
+        from ultralytics import YOLO
+        # task is needed for exported (ONNX/OpenVINO) weights, which carry no task metadata
+        return YOLO(path, task="detect")
+
+    def _create(self):
+        # caller holds self._lock
+        t0 = time.perf_counter()
+        model = self._loader(self.model_path)
+        elapsed = time.perf_counter() - t0
+        if self.load_seconds is None:
+            self.load_seconds = elapsed
+        self._created += 1
+        logging.info("Loaded model %s in %.2fs (%d/%d)", self.model_path, elapsed, self._created, self.pool_size)
+        return model
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                return self._create()
+        return self._idle.get()  # pool exhausted: wait for an instance to come back
+
+    def get(self):
+        """Ensure at least one instance is loaded; returns it for read-only use (e.g. metadata)."""
+        model = self._acquire()
+        self._idle.put(model)
+        return model
+
+    def predict(self, *args, **kwargs):
+        model = self._acquire()
+        try:
+            return model(*args, **kwargs)
+        finally:
+            self._idle.put(model)
+
+    def warm_up(self, image_size=(2480, 3508)):
+        """Load the model and run one throwaway inference so the first real request is not cold."""
+        width, height = image_size
+        self.get()  # load time is reported separately
+        t0 = time.perf_counter()
+        self.predict(np.full((height, width, 3), 255, dtype=np.uint8), verbose=False)
+        self.warmup_seconds = time.perf_counter() - t0
+        logging.info("Model warm-up took %.2fs", self.warmup_seconds)
+        return self.stats()
+
+    @property
+    def loaded(self):
+        return self._created > 0
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "loaded": self.loaded,
+            "instances": self._created,
+            "pool_size": self.pool_size,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
@@ -0,0 +1,132 @@
+# scripts/utils/ocr_engine.py
+
+import re
+import logging
+import threading
+
+import numpy as np
+from PIL import Image
+from pytesseract import image_to_data, Output
+
+from scripts.utils import tracing
+
+OCR_BACKENDS = ("auto", "tesserocr", "pytesseract")
+
+
+def _parse_psm(config, default=3):
+    m = re.search(r"--psm\s+(\d+)", config or "")
+    return int(m.group(1)) if m else default
+
+
+class PytesseractBackend:
+    """Spawns one `tesseract` process per call (the original behaviour)."""
+    name = "pytesseract"
+
+    def image_to_data(self, image, config=""):
+        return image_to_data(image, output_type=Output.DICT, config=config)
+
+
+class TesserocrBackend:
+    """
+    Keeps one initialised libtesseract engine per thread via tesserocr.
+    Images are handed over as raw pixel buffers, so there is no PNG encode,
+    temp file or process start per call.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang="eng"):
+        import tesserocr  # optional dependency
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self._local = threading.local()
+        self._api()  # fail fast if the engine cannot initialise
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=self.lang, oem=self._tesserocr.OEM.DEFAULT)
+            self._local.api = api
+        return api
+
+    def image_to_data(self, image, config=""):
+        tr = self._tesserocr
+        api = self._api()
+        api.SetPageSegMode(_parse_psm(config))
+
+        # One bytes copy of the pixels: PIL images export directly, and numpy views
+        # (page crops) are gathered by tobytes() without an intermediate contiguous copy
+        if isinstance(image, Image.Image):
+            if image.mode not in ("L", "RGB"):
+                image = image.convert("RGB")
+            width, height = image.size
+            bpp = 1 if image.mode == "L" else 3
+            data = image.tobytes()
+        else:
+            arr = image
+            if arr.ndim == 2:
+                bpp = 1
+            elif arr.shape[2] == 4:
+                arr, bpp = arr[:, :, :3], 3
+            else:
+                bpp = arr.shape[2]
+            height, width = arr.shape[:2]
+            data = arr.astype(np.uint8, copy=False).tobytes()
+        api.SetImageBytes(data, width, height, bpp, width * bpp)
+        api.Recognize()
+
+        data = {"text": [], "conf": [], "left": [], "top": [], "width": [], "height": []}
+        level = tr.RIL.WORD
+        iterator = api.GetIterator()
+        if iterator is None:
+            return data
+        for word in tr.iterate_level(iterator, level):
+            box = word.BoundingBox(level)
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            data["text"].append(word.GetUTF8Text(level) or "")
+            data["conf"].append(word.Confidence(level))
+            data["left"].append(x1)
+            data["top"].append(y1)
+            data["width"].append(x2 - x1)
+            data["height"].append(y2 - y1)
+        return data
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+_default_name = "auto"
+
+
+def get_ocr_backend(name=None):
+    """
+    Return a shared backend instance. "auto" prefers tesserocr and falls back
+    to pytesseract if it is not installed or cannot initialise.
+    """
+    name = name or _default_name
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend {name!r}, expected one of {OCR_BACKENDS}")
+    with _backends_lock:
+        if name not in _backends:
+            backend = None
+            if name in ("auto", "tesserocr"):
+                try:
+                    backend = TesserocrBackend()
+                except (ImportError, RuntimeError) as e:
+                    logging.warning("tesserocr unavailable, using pytesseract: %s", e)
+            _backends[name] = backend or PytesseractBackend()
+        return _backends[name]
+
+
+def set_ocr_backend(name):
+    """Select the backend used by `ocr_image_to_data` in this process."""
+    global _default_name
+    get_ocr_backend(name)
+    _default_name = name
+
+
+def ocr_image_to_data(image, config=""):
+    """Drop-in for `pytesseract.image_to_data(..., output_type=Output.DICT)`."""
+    tracing.count("tesseract_calls")
+    with tracing.span("tesseract"):
+        return get_ocr_backend().image_to_data(image, config=config)
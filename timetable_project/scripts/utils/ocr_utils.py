@@ -1,4 +1,7 @@
 import re
+import cv2
+import numpy as np
+from scripts.utils.line_grouping import group_lines_1d
 
 def clean_text(s: str) -> str:
     """
@@ -7,3 +10,42 @@ def clean_text(s: str) -> str:
     s = s.replace("£", "E").replace("—", "-").replace("–", "-").strip()
     s = re.sub(r"[^\x20-\x7E]", "", s)  # Remove non-ASCII
     return s.upper()
+
+
+def threshold_for_ocr(image):
+    """
+    Cyan-masks, grayscales, normalizes and adaptive-thresholds an image for OCR.
+    Run once on the whole page and slice the result, rather than repeating it per crop.
+    Accepts a PIL image or numpy array (RGB or single-channel).
+    """
+    img = np.asarray(image)
+    if img.ndim == 3:
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        # HSV in bands of rows: a full-page HSV copy is as large as the RGB page
+        for y in range(0, img.shape[0], 256):
+            hsv = cv2.cvtColor(img[y:y + 256], cv2.COLOR_RGB2HSV)
+            cyan_mask = cv2.inRange(hsv, (70, 20, 100), (110, 255, 255))
+            gray[y:y + 256][cyan_mask > 0] = 255  # same as whitening the RGB pixels before graying
+        norm = cv2.normalize(gray, gray, 0, 255, cv2.NORM_MINMAX)  # gray is our own copy
+    else:
+        norm = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
+    return cv2.adaptiveThreshold(norm, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                 cv2.THRESH_BINARY, 15, 10)
+
+
+def crop_view(arr, x1, y1, x2, y2):
+    """
+    Zero-copy numpy view of a box, rounded like `PIL.Image.crop` and clamped to the array.
+    """
+    h, w = arr.shape[:2]
+    x1, y1, x2, y2 = (int(round(v)) for v in (x1, y1, x2, y2))
+    return arr[max(y1, 0):min(y2, h), max(x1, 0):min(x2, w)]
+
+
+def reading_order(df, line_gap=10):
+    """
+    Sorts tokens top-to-bottom, then left-to-right within each text line.
+    """
+    df = df.sort_values("yc", kind="mergesort")
+    line_no = group_lines_1d(df["yc"].values, gap=line_gap)  # numbered top-to-bottom
+    return df.assign(_line=line_no).sort_values(["_line", "x1"], kind="mergesort").drop(columns="_line")
@@ -0,0 +1,60 @@
+# scripts/utils/options.py
+
+import os
+from dataclasses import dataclass
+
+
+def _env_bool(name, default):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class ExtractOptions:
+    """
+    Tuning knobs for `extract_timetable`.
+    Defaults run a single process and use the PDF text layer when there is one.
+    """
+    dpi: int = 300
+    color_mode: str = "rgb"   # "rgb" or "gray", see PdfPageSource
+    workers: int = 1          # >1 processes day pages in a process pool
+    use_text_layer: bool = True  # read words from the PDF instead of OCR when possible
+    course_ocr: str = "region"   # "region": one OCR per course block, "column": one per week column
+    ocr_backend: str = "auto"    # "auto", "tesserocr" (in-process engine) or "pytesseract"
+    batch_layout: bool = True    # single-process mode: one batched YOLO pass for all pages
+    layout_cache: bool = True    # reuse refined layout boxes for known page formats
+    result_cache: bool = True    # serve repeat uploads from the on-disk result cache
+    warm_up: bool = False        # run a throwaway YOLO inference when a worker/app starts
+    trace: bool = False          # record per-stage spans and counters, see scripts/utils/tracing.py
+    low_memory: bool = False     # one page in memory at a time, RGB freed once masked, peak RSS per stage
+    memory_budget_mb: int = 0    # warn when an extraction's peak RSS exceeds this (0 = no budget)
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Build options from TIMETABLE_* environment variables, then apply overrides."""
+        values = {
+            "dpi": _env_int("TIMETABLE_DPI", cls.dpi),
+            "color_mode": os.environ.get("TIMETABLE_COLOR_MODE", cls.color_mode),
+            "workers": _env_int("TIMETABLE_WORKERS", cls.workers),
+            "use_text_layer": _env_bool("TIMETABLE_TEXT_LAYER", cls.use_text_layer),
+            "course_ocr": os.environ.get("TIMETABLE_COURSE_OCR", cls.course_ocr),
+            "ocr_backend": os.environ.get("TIMETABLE_OCR_BACKEND", cls.ocr_backend),
+            "batch_layout": _env_bool("TIMETABLE_BATCH_LAYOUT", cls.batch_layout),
+            "layout_cache": _env_bool("TIMETABLE_USE_LAYOUT_CACHE", cls.layout_cache),
+            "result_cache": _env_bool("TIMETABLE_USE_RESULT_CACHE", cls.result_cache),
+            "warm_up": _env_bool("TIMETABLE_WARMUP", cls.warm_up),
+            "trace": _env_bool("TIMETABLE_TRACE", cls.trace),
+            "low_memory": _env_bool("TIMETABLE_LOW_MEMORY", cls.low_memory),
+            "memory_budget_mb": _env_int("TIMETABLE_MEMORY_BUDGET_MB", cls.memory_budget_mb),
+        }
+        values.update(overrides)
+        return cls(**values)
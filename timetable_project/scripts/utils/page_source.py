@@ -0,0 +1,129 @@
+# scripts/utils/page_source.py
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+
+from PIL import Image
+
+from scripts.utils import tracing
+
+COLOR_MODES = ("rgb", "gray")
+
+
+@dataclass
+class RenderedPage:
+    index: int              # 0-based page index in the PDF
+    image: Image.Image
+    render_seconds: float   # wall time poppler spent on this page
+
+    def take_image(self):
+        """Return the image and drop this page's reference to it, so the callee holds the last one."""
+        image, self.image = self.image, None
+        return image
+
+
+class PdfPageSource:
+    """
+    Renders a range of PDF pages with a single `pdftoppm` process.
+
+    Pages are yielded lazily as soon as poppler has finished writing them, so the
+    document is opened and parsed once instead of once per page, and the caller
+    can start working on page 1 while later pages are still being rendered.
+    """
+
+    def __init__(self, pdf_path, dpi=300, color_mode="rgb", first_page=1, last_page=None, poppler_path=None):
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"color_mode must be one of {COLOR_MODES}, got {color_mode!r}")
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.color_mode = color_mode
+        self.first_page = first_page
+        self.last_page = last_page
+        self.poppler_path = poppler_path
+        self.page_timings = {}  # page index -> render seconds
+
+    def _command(self, out_prefix):
+        exe = "pdftoppm"
+        if self.poppler_path:
+            exe = os.path.join(self.poppler_path, exe)
+        cmd = [exe, "-r", str(self.dpi), "-f", str(self.first_page)]
+        if self.last_page is not None:
+            cmd += ["-l", str(self.last_page)]
+        if self.color_mode == "gray":
+            cmd.append("-gray")
+        return cmd + [self.pdf_path, out_prefix]
+
+    @staticmethod
+    def _page_files(out_dir):
+        # pdftoppm names pages "<prefix>-<n>.ppm" with a zero-padded page number
+        files = []
+        for name in os.listdir(out_dir):
+            m = re.match(r"page-(\d+)\.p[pg]m$", name)
+            if m:
+                files.append((int(m.group(1)), os.path.join(out_dir, name)))
+        return sorted(files)
+
+    @staticmethod
+    def _load(path):
+        with Image.open(path) as img:
+            img.load()
+        return img
+
+    def __iter__(self):
+        out_dir = tempfile.mkdtemp(prefix="timetable_pages_")
+        started_at = time.time()
+        # stderr goes to a file so a chatty poppler can never block on a full pipe
+        err_file = tempfile.TemporaryFile()
+        proc = subprocess.Popen(self._command(os.path.join(out_dir, "page")),
+                                stdout=subprocess.DEVNULL, stderr=err_file)
+        try:
+            # Page files are closed as soon as poppler finishes them, so consecutive
+            # mtimes give the per-page render time independent of how long the
+            # caller spends between iterations.
+            last_mark = started_at
+            waiting_since = time.perf_counter()  # the consumer is blocked on the next page from here
+            emitted = set()
+            while True:
+                finished = proc.poll() is not None
+                files = self._page_files(out_dir)
+                # While poppler is running, the newest file may still be half-written
+                ready = files if finished else files[:-1]
+                for page_no, path in ready:
+                    if page_no in emitted:
+                        continue
+                    written_at = os.path.getmtime(path)
+                    index = page_no - 1
+                    self.page_timings[index] = max(written_at - last_mark, 0.0)
+                    last_mark = written_at
+                    page = RenderedPage(index=index, image=self._load(path), render_seconds=self.page_timings[index])
+                    os.remove(path)
+                    emitted.add(page_no)
+                    tracing.record("rasterize", waiting_since, page=page_no,
+                                   render_seconds=round(self.page_timings[index], 4))
+                    yield page
+                    # Drop our reference so a caller that releases the image frees it now
+                    del page
+                    waiting_since = time.perf_counter()
+                if finished:
+                    break
+                time.sleep(0.01)
+
+            if proc.returncode != 0 and not emitted:
+                err_file.seek(0)
+                err = err_file.read().decode(errors="replace").strip()
+                raise RuntimeError(f"pdftoppm failed ({proc.returncode}): {err}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            err_file.close()
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    @property
+    def total_render_seconds(self):
+        return sum(self.page_timings.values())
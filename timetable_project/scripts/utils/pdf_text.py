@@ -0,0 +1,68 @@
+# scripts/utils/pdf_text.py
+
+import os
+import logging
+import subprocess
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+TOKEN_COLUMNS = ["text", "conf", "x1", "y1", "width", "height", "x2", "y2", "xc", "yc"]
+
+
+def _local(tag):
+    # pdftotext emits XHTML, so tags carry the xhtml namespace
+    return tag.rsplit("}", 1)[-1]
+
+
+def empty_token_df():
+    return pd.DataFrame({col: pd.Series(dtype="object" if col == "text" else "float") for col in TOKEN_COLUMNS})
+
+
+def parse_bbox_layout(xhtml, dpi=300, first_page=1):
+    """
+    Parse `pdftotext -bbox-layout` output into one token table per page.
+    Coordinates are scaled from PDF points to pixels at `dpi`, so the tables line up
+    with the rendered page images and have the same columns as `extract_ocr_df`.
+    """
+    scale = dpi / 72.0
+    root = ET.fromstring(xhtml)
+    pages = {}
+    page_no = first_page
+    for page in root.iter():
+        if _local(page.tag) != "page":
+            continue
+        rows = []
+        for word in page.iter():
+            if _local(word.tag) != "word":
+                continue
+            text = (word.text or "").strip()
+            if not text:
+                continue
+            x1 = float(word.get("xMin")) * scale
+            y1 = float(word.get("yMin")) * scale
+            x2 = float(word.get("xMax")) * scale
+            y2 = float(word.get("yMax")) * scale
+            rows.append((text, 100, x1, y1, x2 - x1, y2 - y1, x2, y2, (x1 + x2) / 2, (y1 + y2) / 2))
+        pages[page_no - 1] = pd.DataFrame(rows, columns=TOKEN_COLUMNS) if rows else empty_token_df()
+        page_no += 1
+    return pages
+
+
+def extract_text_layer(pdf_path, dpi=300, first_page=1, last_page=None, poppler_path=None):
+    """
+    Read positioned words from the PDF's own text layer with a single `pdftotext` run.
+    Returns {page index: token DataFrame}; pages without selectable text get an empty
+    table. Returns {} if pdftotext is unavailable, so callers fall back to OCR.
+    """
+    exe = os.path.join(poppler_path, "pdftotext") if poppler_path else "pdftotext"
+    cmd = [exe, "-bbox-layout", "-f", str(first_page)]
+    if last_page is not None:
+        cmd += ["-l", str(last_page)]
+    cmd += [pdf_path, "-"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+        return parse_bbox_layout(out, dpi=dpi, first_page=first_page)
+    except (OSError, subprocess.CalledProcessError, ET.ParseError) as e:
+        logging.warning("PDF text layer unavailable, falling back to OCR: %s", e)
+        return {}
@@ -0,0 +1,134 @@
+# scripts/utils/result_cache.py
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "timetable_extraction", "results")
+
+try:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of extraction results.
+
+    One JSON file per key. Writes go to a temp file and are renamed into place, so
+    concurrent readers only ever see complete entries. Reads bump the file's mtime,
+    and after each write the least recently used files are evicted until the
+    directory fits in `max_bytes`; eviction holds an exclusive lock file so
+    several processes can share the directory.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_sha256, version):
+        """`version` identifies everything besides the PDF that shapes the output."""
+        return hashlib.sha256(f"{pdf_sha256}:{version}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # LRU: mark as recently used
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning("Dropping unreadable result cache entry %s: %s", path, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.root, ".lock"), "a+b") as f:
+            _lock_file(f)
+            try:
+                yield
+            finally:
+                _unlock_file(f)
+
+    def evict(self):
+        with self._locked():
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.root, name))
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self._locked():
+            for name in os.listdir(self.root):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.root, name))
+
+
+def get_result_cache():
+    """Cache configured by TIMETABLE_RESULT_CACHE (directory) and TIMETABLE_RESULT_CACHE_MB."""
+    root = os.environ.get("TIMETABLE_RESULT_CACHE", DEFAULT_CACHE_DIR)
+    max_mb = float(os.environ.get("TIMETABLE_RESULT_CACHE_MB", "256"))
+    return ResultCache(root, max_bytes=int(max_mb * 1024 * 1024))
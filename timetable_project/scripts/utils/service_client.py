@@ -0,0 +1,59 @@
+# scripts/utils/service_client.py
+
+import json
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import quote
+
+
+class ServiceError(RuntimeError):
+    pass
+
+
+def _request(url, data=None, headers=None, timeout=30):
+    req = urllib.request.Request(url, data=data, headers=headers or {}, method="POST" if data is not None else "GET")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        try:
+            return e.code, json.loads(body or b"null")
+        except ValueError:
+            return e.code, {"error": body.decode("utf-8", "replace")}
+
+
+def extract_via_service(base_url, pdf_bytes, filename="", timeout=600, poll_interval=0.5, max_retries=20):
+    """
+    Submit a PDF to extraction_service.py and wait for its entries.
+    Backs off and resubmits while the service answers 429 (queue full).
+    """
+    base_url = base_url.rstrip("/")
+    headers = {"Content-Type": "application/pdf", "X-Filename": quote(filename)}
+
+    delay = 1.0
+    for _ in range(max_retries):
+        status, body = _request(f"{base_url}/jobs", data=pdf_bytes, headers=headers)
+        if status != 429:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 15)  # ⏳ service is busy
+    if status != 202:
+        raise ServiceError(f"Extraction service refused the PDF ({status}): {body}")
+
+    job_id = body["id"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, info = _request(f"{base_url}/jobs/{job_id}")
+        if status != 200:
+            raise ServiceError(f"Lost track of job {job_id} ({status}): {info}")
+        if info["status"] == "done":
+            status, entries = _request(f"{base_url}/jobs/{job_id}/result")
+            if status != 200:
+                raise ServiceError(f"Could not fetch result of job {job_id} ({status}): {entries}")
+            return entries
+        if info["status"] == "error":
+            raise ServiceError(f"Extraction failed: {info.get('error')}")
+        time.sleep(poll_interval)
+    raise ServiceError(f"Timed out after {timeout}s waiting for job {job_id}")
@@ -0,0 +1,31 @@
+# scripts/utils/token_index.py
+
+import numpy as np
+
+
+class TokenIndex:
+    """
+    Sorted-coordinate index over a page token table (OCR or PDF text layer).
+
+    Tokens are sorted once by their y-centre; a rectangle query binary-searches
+    the y-range and only then filters on x, so lookups cost O(log n + k) instead
+    of a full scan or a fresh Tesseract run on the crop.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        yc = df["yc"].to_numpy(dtype=float)
+        self._order = np.argsort(yc, kind="mergesort")
+        self._yc = yc[self._order]
+        self._xc = df["xc"].to_numpy(dtype=float)[self._order]
+
+    def __len__(self):
+        return len(self.df)
+
+    def query(self, x1, y1, x2, y2):
+        """Tokens whose centre lies inside the rectangle, in the table's original order."""
+        lo = np.searchsorted(self._yc, y1, side="left")
+        hi = np.searchsorted(self._yc, y2, side="right")
+        xc = self._xc[lo:hi]
+        hits = self._order[lo:hi][(xc >= x1) & (xc <= x2)]
+        return self.df.iloc[np.sort(hits)].copy()
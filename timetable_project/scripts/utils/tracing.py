@@ -0,0 +1,281 @@
+# scripts/utils/tracing.py
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# The tracer spans and counters go to; None (the default) means tracing is off and
+# every hook below returns after a single ContextVar lookup
+_active = ContextVar("timetable_tracer", default=None)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def current_rss():
+    """Resident set size of this process in bytes (Linux /proc, else psutil if installed), or None."""
+    if _PAGE_SIZE:
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class RssSampler:
+    """
+    Samples this process's RSS every `interval` seconds on a daemon thread, so the
+    peak inside a span is seen even when memory is freed again before the span ends.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.times = []
+        self.values = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss()
+            if rss is None:
+                return
+            self.times.append(time.perf_counter())
+            self.values.append(rss)
+            self._stop.wait(self.interval)
+
+    def peak(self, start, end):
+        """Highest sample taken between start and end (perf_counter), or 0."""
+        n = min(len(self.times), len(self.values))
+        lo = bisect_left(self.times, start, 0, n)
+        hi = bisect_left(self.times, end, lo, n)
+        return max(self.values[lo:hi], default=0)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start", "rss")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.rss = None
+
+    def __enter__(self):
+        if self.tracer.memory:
+            self.rss = current_rss()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.start, time.perf_counter(), rss_start=self.rss, **self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Wall-time spans and counters for one extraction (or any block of work).
+
+    Spans are (name, start, end) on the perf_counter clock, which is shared by the
+    processes of a pool, so spans recorded in workers can be merged in with `merge`.
+    With memory=True every span also records the peak RSS it saw ("peak_mb") and how
+    far above the RSS at its start that was ("delta_mb"); call `close` when done.
+    """
+
+    def __init__(self, memory=False):
+        self.origin = time.perf_counter()
+        self.spans = []     # (name, start, end, pid, tid, args)
+        self.counters = {}
+        self.memory = memory
+        self._sampler = RssSampler() if memory else None
+        self._lock = threading.Lock()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def add(self, name, start, end=None, rss_start=None, **args):
+        end = time.perf_counter() if end is None else end
+        if self.memory:
+            rss_end = current_rss() or 0
+            peak = max(rss_end, rss_start or 0, self._sampler.peak(start, end) if self._sampler else 0)
+            args["peak_mb"] = round(peak / 2 ** 20, 1)
+            if rss_start is not None:
+                args["delta_mb"] = round((peak - rss_start) / 2 ** 20, 1)
+        with self._lock:
+            self.spans.append((name, start, end, os.getpid(), threading.get_ident(), args))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def export(self):
+        """Picklable spans and counters, e.g. to send back from a pool worker."""
+        with self._lock:
+            return list(self.spans), dict(self.counters)
+
+    def merge(self, exported):
+        spans, counters = exported
+        with self._lock:
+            self.spans.extend(spans)
+            for name, n in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def close(self):
+        """Stop RSS sampling; later spans still record RSS at their start and end."""
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    def summary(self):
+        """
+        {span name: {"calls", "seconds", "mean_ms", "max_ms"}} in order of first appearance,
+        plus "peak_mb" and "delta_mb" (highest over the calls) when memory was traced.
+        """
+        stats = {}
+        for name, start, end, _, _, args in self.spans:
+            s = stats.setdefault(name, {"calls": 0, "seconds": 0.0, "max_ms": 0.0})
+            s["calls"] += 1
+            s["seconds"] += end - start
+            s["max_ms"] = max(s["max_ms"], (end - start) * 1000)
+            for key in ("peak_mb", "delta_mb"):
+                if key in args:
+                    s[key] = max(s.get(key, 0.0), args[key])
+        for s in stats.values():
+            s["mean_ms"] = s["seconds"] * 1000 / s["calls"]
+        return stats
+
+    def peak_rss_mb(self):
+        """
+        (peak MB, span name) over every span with memory figures, or (None, None).
+        Nested spans share a peak, so ties go to the shortest (innermost) span.
+        """
+        peaks = [(args["peak_mb"], start - end, name)
+                 for name, start, end, _, _, args in self.spans if "peak_mb" in args]
+        if not peaks:
+            return None, None
+        peak, _, name = max(peaks)
+        return peak, name
+
+    def summary_text(self):
+        summary = self.summary()
+        memory = any("peak_mb" in s for s in summary.values())
+        header = f"{'stage':<18}{'calls':>7}{'total ms':>11}{'mean ms':>10}{'max ms':>10}"
+        lines = [header + (f"{'peak MB':>10}{'+MB':>8}" if memory else "")]
+        for name, s in summary.items():
+            line = f"{name:<18}{s['calls']:>7}{s['seconds'] * 1000:>11.1f}{s['mean_ms']:>10.2f}{s['max_ms']:>10.2f}"
+            if memory:
+                line += f"{s.get('peak_mb', float('nan')):>10.1f}{s.get('delta_mb', float('nan')):>8.1f}"
+            lines.append(line)
+        if self.counters:
+            lines.append(", ".join(f"{name}={n}" for name, n in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "summary": self.summary(),
+            "counters": dict(self.counters),
+            "spans": [{"name": name, "start": start - self.origin, "seconds": end - start,
+                       "pid": pid, "tid": tid, "args": args}
+                      for name, start, end, pid, tid, args in self.spans],
+        }
+
+    def to_chrome_trace(self):
+        """Trace Event Format, for chrome://tracing or ui.perfetto.dev."""
+        events = [{"name": name, "cat": "timetable", "ph": "X", "ts": (start - self.origin) * 1e6,
+                   "dur": (end - start) * 1e6, "pid": pid, "tid": tid, "args": args}
+                  for name, start, end, pid, tid, args in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": dict(self.counters)}}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+
+
+# === Hooks used by the pipeline ===
+def current():
+    return _active.get()
+
+
+def span(name, **args):
+    """`with span("yolo"):` records a span if a tracer is active, else does nothing."""
+    tracer = _active.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+
+def count(name, n=1):
+    tracer = _active.get()
+    if tracer is not None:
+        tracer.count(name, n)
+
+
+def record(name, start, end=None, **args):
+    """Add a span whose start (perf_counter) was taken earlier, e.g. across a generator yield."""
+    tracer = _active.get()
+    if tracer is not None:
+        tracer.add(name, start, end, **args)
+
+
+@contextmanager
+def activate(tracer):
+    """Make `tracer` (may be None) the active tracer for this thread/context."""
+    token = _active.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def trace(enabled=True, memory=False):
+    """
+    Trace the block with a new Tracer (sampling RSS with memory=True) and log its
+    summary at the end. If a tracer is already active (the caller is tracing), spans
+    go to that one instead. Yields the tracer in use, or None when tracing is off.
+    """
+    parent = _active.get()
+    if parent is not None or not enabled:
+        yield parent
+        return
+    tracer = Tracer(memory=memory)
+    try:
+        with activate(tracer):
+            yield tracer
+    finally:
+        tracer.close()
+        logging.info("Extraction trace:\n%s", tracer.summary_text())
@@ -1,12 +1,13 @@
 # scripts/utils/ui_helpers.py
 
 from datetime import datetime, timedelta, date
+from bisect import insort
+from functools import lru_cache
 import streamlit as st
-from ics import Calendar, Event
-from ics.grammar.parse import ContentLine
 import pytz
 import logging
 from scripts.utils.constants import DAYS, WEEKS
+from scripts.utils.ics_writer import get_week_index, split_weeks_into_blocks, generate_ics_bytes
 
 def red_alert(text):
     st.markdown(f'<div style="color: red; font-weight: bold;">⚠️ {text}</div>', unsafe_allow_html=True)
@@ -21,9 +22,6 @@ def timezone_converter(date, zone):
     timezone = pytz.timezone(zone)
     return timezone.localize(date)
 
-def get_week_index(w):
-    return WEEKS.index(w) if w in WEEKS else -1
-
 def extract_semester_year(courses):
     for c in courses:
         raw = str(c.get("startDate", "")).strip()
@@ -34,52 +32,88 @@ def extract_semester_year(courses):
             continue
     return datetime.today().year
 
-def get_inferred_start_date(course, all_courses):
-    """
-    Infer course startDate based on other block with:
-    - Same day, any week → adjust by week index diff
-    - Same week, different day → adjust by weekday diff
-    Skips if both week and day are different.
-    """
-    def day_index(day_name):
-        try:
-            return DAYS.index(day_name)
-        except:
-            return -1
+@lru_cache(maxsize=4096)
+def _parse_date_str(raw):
+    try:
+        return datetime.strptime(raw, "%d %b %y").date()
+    except ValueError:
+        return None
 
-    raw = str(course.get("startDate", "")).strip().upper()
-    if raw and raw != "UNKNOWN":
-        try:
-            datetime.strptime(raw, "%d %b %y")
-            return None, None  # already valid
-        except:
-            pass
+def parse_start_date(value):
+    """A 'DD Mon YY' start date string -> date, else None (date objects picked in the editor don't count)."""
+    return _parse_date_str(str(value).strip())
 
-    try:
-        course_weeks = [w for w in course.get("weeks", []) if w in WEEKS]
-        course_week = course_weeks[0] if course_weeks else None
-    except:
-        course_week = None
+def _first_week(course):
+    weeks = [w for w in course.get("weeks", []) if w in WEEKS]
+    return weeks[0] if weeks else None
 
-    course_day = course.get("day")
+def _day_index(day_name):
+    return DAYS.index(day_name) if day_name in DAYS else -1
 
-    for other in all_courses:
-        if other["id"] == course["id"]:
-            continue
 
-        other_day = other.get("day")
-        other_weeks = [w for w in other.get("weeks", []) if w in WEEKS]
-        other_week = other_weeks[0] if other_weeks else None
+class StartDateIndex:
+    """
+    Courses with a known start date, keyed by day and by first week, so inferring a
+    missing date is a lookup instead of a scan of every course.
 
-        try:
-            known_raw = str(other.get("startDate", "")).strip()
-            known_date = datetime.strptime(known_raw, "%d %b %y").date()
-        except:
-            continue
+    Build it once per rerun from the course list, and call `update(course)` after a
+    course's day, weeks or start date change. As before, the earliest course in the
+    list that shares the day or the week is the one a date is inferred from.
+    """
+
+    def __init__(self, courses):
+        self._pos = {}      # course id -> list position
+        self._course = {}   # list position -> course
+        self._keys = {}     # position -> (day, week) of courses with a known date
+        self._by_day = {}   # day -> sorted positions
+        self._by_week = {}  # first week -> sorted positions
+        for pos, course in enumerate(courses):
+            self._pos[course["id"]] = pos
+            self._add(pos, course)
+
+    def _add(self, pos, course):
+        self._course[pos] = course
+        if parse_start_date(course.get("startDate", "")) is None:
+            return
+        day, week = course.get("day"), _first_week(course)
+        self._keys[pos] = (day, week)
+        insort(self._by_day.setdefault(day, []), pos)
+        insort(self._by_week.setdefault(week, []), pos)
+
+    def _remove(self, pos):
+        key = self._keys.pop(pos, None)
+        if key is not None:
+            self._by_day[key[0]].remove(pos)
+            self._by_week[key[1]].remove(pos)
+
+    def update(self, course):
+        pos = self._pos.get(course["id"])
+        if pos is None:  # new course, appended to the list
+            pos = self._pos[course["id"]] = len(self._pos)
+        self._remove(pos)
+        self._add(pos, course)
+
+    def infer(self, course):
+        """(inferred date, course it came from), or (None, None)."""
+        course_day, course_week = course.get("day"), _first_week(course)
+        own = self._pos.get(course.get("id"))
+
+        best = None
+        for positions in (self._by_day.get(course_day, ()), self._by_week.get(course_week, ())):
+            for pos in positions[:2]:
+                if pos != own:
+                    best = pos if best is None else min(best, pos)
+                    break
+        if best is None:
+            return None, None
+
+        other = self._course[best]
+        other_day, other_week = self._keys[best]
+        known_date = parse_start_date(other.get("startDate", ""))
 
         # Same week, different day
         if course_week == other_week and course_day != other_day:
-            d_diff = day_index(course_day) - day_index(other_day)
+            d_diff = _day_index(course_day) - _day_index(other_day)
             return known_date + timedelta(days=d_diff), other
 
         # Same day, different week
@@ -88,14 +122,28 @@ def get_inferred_start_date(course, all_courses):
             return known_date + timedelta(weeks=w_diff), other
 
         # Exact match
-        if course_day == other_day and course_week == other_week:
-            return known_date, other
+        return known_date, other
+
 
-    return None, None  # Nothing found
+def get_inferred_start_date(course, all_courses, index=None):
+    """
+    Infer course startDate based on other block with:
+    - Same day, any week → adjust by week index diff
+    - Same week, different day → adjust by weekday diff
+    Skips if both week and day are different.
+    Pass a StartDateIndex to avoid rescanning `all_courses`.
+    """
+    raw = str(course.get("startDate", "")).strip().upper()
+    if raw and raw != "UNKNOWN" and _parse_date_str(raw) is not None:
+        return None, None  # already valid
+
+    if index is None:
+        index = StartDateIndex(all_courses)
+    return index.infer(course)
 
 
 
-def render_date_input(c1, course, all_courses):
+def render_date_input(c1, course, all_courses, date_index=None):
     """
     Display a date_input with safe update logic:
     - Automatically assigns inferred dates
@@ -119,7 +167,7 @@ def render_date_input(c1, course, all_courses):
 
     # If not valid, try to infer
     if not parsed_date:
-        inferred_date, inferred_from = get_inferred_start_date(course, all_courses)
+        inferred_date, inferred_from = get_inferred_start_date(course, all_courses, date_index)
         if inferred_date:
             parsed_date = inferred_date
             course["startDate"] = inferred_date  # ✅ Save it directly
@@ -199,93 +247,113 @@ def render_time_inputs(st, course):
 
 
 
-def split_weeks_into_blocks(weeks):
-    blocks = []
-    current = []
-    prev_index = None
-
-    for w in weeks:
-        if w == "Recess":
-            if current:
-                blocks.append(current)
-                current = []
-            prev_index = None
-            continue
-
-        idx = get_week_index(w)
-        if prev_index is not None and idx != prev_index + 1:
-            blocks.append(current)
-            current = []
-        current.append(w)
-        prev_index = idx
-
-    if current:
-        blocks.append(current)
 
-    return blocks
 
-def generate_ics_from_courses(courses):
-    cal = Calendar()
-    timezone = "Asia/Singapore"
-    errors = []
-    all_events = []
+class ValidationTracker:
+    """
+    Missing required fields (and any extra `checks`, each returning an error message
+    or None) per course id. Only courses that were edited are re-checked, so the
+    invalid count stays cheap as the course list grows.
+    """
 
-    for idx, entry in enumerate(courses):
-        try:
-            raw_date = entry.get("startDate")
-            if isinstance(raw_date, str):
-                if raw_date.upper() == "UNKNOWN":
-                    raise ValueError("Missing startDate")
-                start_date = datetime.strptime(raw_date, "%d %b %y").date()
-            elif isinstance(raw_date, date):
-                start_date = raw_date
+    def __init__(self, required_fields, checks=()):
+        self.required_fields = list(required_fields)
+        self.checks = list(checks)
+        self.missing = {}
+        self.errors = {}
+
+    def check(self, course):
+        course_id = course["id"]
+        missing = [f for f in self.required_fields if not course.get(f)]
+        errors = [msg for msg in (check(course) for check in self.checks) if msg]
+        for store, found in ((self.missing, missing), (self.errors, errors)):
+            if found:
+                store[course_id] = found
             else:
-                raise ValueError("Invalid startDate type")
-
-            start_str, end_str = entry["time"].split("-")
-            start_h, start_m = int(start_str[:2]), int(start_str[2:])
-            end_h, end_m = int(end_str[:2]), int(end_str[2:])
-
-            course_weeks = entry["weeks"]
-            all_blocks = split_weeks_into_blocks(course_weeks)
-
-            course_first_week = course_weeks[0]
-            course_first_week_index = get_week_index(course_first_week)
+                store.pop(course_id, None)
+        return missing
 
-            for block in all_blocks:
-                block_first_week = block[0]
-                block_week_index = get_week_index(block_first_week)
-                week_diff = block_week_index - course_first_week_index
+    def check_all(self, courses):
+        self.missing, self.errors = {}, {}
+        for course in courses:
+            self.check(course)
 
-                # ✅ Adjust only by week_diff to preserve original weekday
-                session_date = start_date + timedelta(weeks=week_diff)
+    def discard(self, course_id):
+        self.missing.pop(course_id, None)
+        self.errors.pop(course_id, None)
 
-                dt_start = timezone_converter(datetime(session_date.year, session_date.month, session_date.day, start_h, start_m), timezone)
-                dt_end = timezone_converter(datetime(session_date.year, session_date.month, session_date.day, end_h, end_m), timezone)
+    @property
+    def invalid_count(self):
+        return len(self.missing.keys() | self.errors.keys())
 
-                e = Event()
-                e.name = f"{entry['courseCode']} ({entry['group']})"
-                e.location = entry["location"]
-                e.begin = dt_start
-                e.end = dt_end
-                e.description = f"Weeks: {', '.join(block)}"
-                if entry.get("note"):
-                    e.description += f"\nNote: {entry['note']}"
 
-                # RRULE: recurrence per week block
-                e.rrule = {"FREQ": "WEEKLY", "COUNT": len(block)}
-                e.extra.append(ContentLine(name="RRULE", value=f"FREQ=WEEKLY;COUNT={len(block)}"))
-
-                all_events.append(e)
-
-        except Exception as e:
-            errors.append(f"Error in Course {idx + 1}: {e}")
-
-    # Sort by time and course
-    all_events.sort(key=lambda e: (e.begin.datetime, e.name))
-    for e in all_events:
-        cal.events.add(e)
-
-    return cal, errors
+# === Table editor (st.data_editor) rows ===
+TABLE_COLUMNS = ["id", "courseCode", "group", "location", "day", "weeks", "start", "end", "startDate", "note"]
 
 
+def _parse_hhmm(value):
+    try:
+        return datetime.strptime(value, "%H%M").time()
+    except (TypeError, ValueError):
+        return None
+
+
+def course_to_row(course):
+    """Course dict -> flat table row: weeks as '1, 2, 3', times as time objects, startDate as a date."""
+    start_raw, _, end_raw = str(course.get("time", "")).partition("-")
+    start_date = course.get("startDate")
+    if not isinstance(start_date, date):
+        start_date = parse_start_date(start_date)
+    return {
+        "id": course["id"],
+        "courseCode": course.get("courseCode", ""),
+        "group": course.get("group", ""),
+        "location": course.get("location", ""),
+        "day": course.get("day", ""),
+        "weeks": ", ".join(course.get("weeks", [])),
+        "start": _parse_hhmm(start_raw),
+        "end": _parse_hhmm(end_raw),
+        "startDate": start_date,
+        "note": course.get("note", ""),
+    }
+
+
+def _is_blank(value):
+    return value is None or value != value  # None, NaN or NaT from newly added rows
+
+
+def row_to_course(row, course_id):
+    """Table row -> course dict in the usual shape (startDate as a date, or "UNKNOWN")."""
+    def text(value):
+        return "" if _is_blank(value) else str(value)
+
+    start, end, start_date = row.get("start"), row.get("end"), row.get("startDate")
+    has_time = not _is_blank(start) and not _is_blank(end)
+    if _is_blank(start_date):
+        start_date = "UNKNOWN"
+    elif isinstance(start_date, datetime):
+        start_date = start_date.date()
+    return {
+        "id": course_id,
+        "courseCode": text(row.get("courseCode")),
+        "group": text(row.get("group")),
+        "location": text(row.get("location")),
+        "weeks": [w.strip() for w in text(row.get("weeks")).split(",") if w.strip() in WEEKS],
+        "day": text(row.get("day")) or "Monday",
+        "time": f"{start.strftime('%H%M')}-{end.strftime('%H%M')}" if has_time else "",
+        "startDate": start_date,
+        "note": text(row.get("note")),
+    }
+
+
+def time_range_error(course):
+    """Same rules as render_time_inputs, for courses edited in the table."""
+    start, _, end = str(course.get("time", "")).partition("-")
+    start, end = _parse_hhmm(start), _parse_hhmm(end)
+    if start is None or end is None:
+        return None  # reported as a missing field
+    if start >= end:
+        return "End time must be after start time."
+    if start < datetime.strptime("0830", "%H%M").time() or end > datetime.strptime("2230", "%H%M").time():
+        return "Time must be between 08:30 and 22:30."
+    return None
@@ -0,0 +1,9 @@
+# tests/conftest.py
+#
+# Run from timetable_project/:  python -m pytest tests
+
+import os
+import sys
+
+# The pipeline imports itself as `scripts.*`, so the project folder must be importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+# tests/test_holiday_matcher.py
+
+from scripts.utils.holiday_matcher import HolidayMatcher
+
+
+def test_match_lines_finds_holiday():
+    single, pair = HolidayMatcher().match_lines(["GOOD", "FRIDAY", "EG1001"])
+    assert single == [None, None, None]
+    assert pair[0] == "GOOD FRIDAY"
+
+
+def test_memo_eviction_keeps_hits_from_the_same_call():
+    matcher = HolidayMatcher(memo_size=4)
+    assert matcher.match_lines(["DEEPAVALI", "X"])[0] == ["DEEPAVALI", None]
+    # DEEPAVALI is memoized; the new lines overflow the memo and clear it mid-call
+    assert matcher.match_lines(["DEEPAVALI", "Y", "Z"])[0] == ["DEEPAVALI", None, None]
+
+
+def test_memo_cleared_by_another_caller():
+    matcher = HolidayMatcher()
+    matcher.match_lines(["DEEPAVALI"])
+    queries = ["deepavali", "eg1001"]
+
+    class ClearingMemo(dict):
+        def update(self, other):
+            # Simulate another thread clearing the memo between lookup and store
+            self.clear()
+            super().update(other)
+
+    matcher._memo = ClearingMemo(matcher._memo)
+    assert matcher._score(queries) == ["DEEPAVALI", None]
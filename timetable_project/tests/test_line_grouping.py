@@ -0,0 +1,45 @@
+# tests/test_line_grouping.py
+#
+# Expected labels are what DBSCAN(eps=gap, min_samples=1) returns for the same
+# values: neighbours are points at distance <= eps, clusters numbered by first member.
+
+import numpy as np
+
+from scripts.utils.line_grouping import gap_slices, group_lines_1d
+
+
+def labels(values, gap=20):
+    return group_lines_1d(np.array(values, dtype=float), gap).tolist()
+
+
+def test_empty_and_single():
+    assert labels([]) == []
+    assert labels([42.0]) == [0]
+
+
+def test_gap_exactly_at_eps_joins():
+    assert labels([100, 120, 140]) == [0, 0, 0]
+
+
+def test_gap_just_above_eps_splits():
+    assert labels([100, 120.001, 140.002]) == [0, 1, 2]
+    assert labels([100, 120, 140.5]) == [0, 0, 1]
+
+
+def test_duplicate_values():
+    assert labels([50, 50, 50, 200, 200]) == [0, 0, 0, 1, 1]
+    assert labels([200, 50, 200, 50]) == [0, 1, 0, 1]
+
+
+def test_unsorted_input_numbered_by_first_appearance():
+    # Sorted clusters are {10, 15}, {100, 110}, {300}; they first appear as 300, 15, 110
+    assert labels([300, 15, 110, 10, 100]) == [0, 1, 2, 1, 2]
+
+
+def test_chain_joins_points_further_apart_than_eps():
+    assert labels([0, 60, 20, 40]) == [0, 0, 0, 0]
+
+
+def test_gap_slices():
+    assert gap_slices([], 20) == []
+    assert gap_slices([0, 20, 41, 41, 100], 20) == [(0, 2), (2, 4), (4, 5)]
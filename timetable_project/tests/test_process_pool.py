@@ -0,0 +1,55 @@
+# tests/test_process_pool.py
+
+import pytest
+
+import scripts.extract_timetable as pipeline
+
+
+class FakePool:
+    """Stands in for ProcessPoolExecutor; submit after shutdown raises like the real one."""
+
+    def __init__(self, max_workers, **kwargs):
+        self.max_workers = max_workers
+        self.is_shutdown = False
+
+    def submit(self, fn, *args):
+        if self.is_shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return fn(*args)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.is_shutdown = True
+
+
+@pytest.fixture(autouse=True)
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(pipeline, "_pool", None)
+    monkeypatch.setattr(pipeline, "_pool_workers", 0)
+    monkeypatch.setattr(pipeline, "_pool_users", {})
+
+
+def test_pool_is_reused_for_the_same_worker_count():
+    with pipeline._use_pool(2) as first:
+        pass
+    with pipeline._use_pool(2) as second:
+        assert second is first
+    assert not first.is_shutdown
+
+
+def test_pool_in_use_survives_a_request_for_another_count():
+    with pipeline._use_pool(2) as held:
+        with pipeline._use_pool(3) as other:
+            assert other is not held and other.max_workers == 3
+        # Another session replaced the pool while this one was still submitting pages
+        assert held.submit(lambda x: x + 1, 1) == 2
+    assert held.is_shutdown
+    assert not other.is_shutdown
+
+
+def test_idle_pool_is_shut_down_when_replaced():
+    with pipeline._use_pool(2) as old:
+        pass
+    with pipeline._use_pool(4):
+        assert old.is_shutdown
+    assert pipeline._pool_users == {}
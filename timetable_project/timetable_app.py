@@ -1,11 +1,20 @@
+import os
+import json
 import streamlit as st
 import tempfile
 import uuid
+import math
+import pandas as pd
 from ultralytics import __version__ as yolo_version
-from datetime import datetime
+from datetime import datetime, date
 
-from scripts.utils.constants import DAYS, WEEKS
-from scripts.utils.ui_helpers import render_time_inputs, render_date_input, generate_ics_from_courses, log_error, timezone_converter
+from scripts.utils.constants import DAYS, WEEKS, IMAGE_SIZE
+from scripts.utils.options import ExtractOptions
+from scripts.utils import tracing
+from scripts.utils.ui_helpers import (render_time_inputs, render_date_input, generate_ics_bytes, log_error,
+                                      timezone_converter, red_alert, parse_start_date, get_inferred_start_date,
+                                      StartDateIndex, ValidationTracker, TABLE_COLUMNS, course_to_row,
+                                      row_to_course, time_range_error)
 
 
 # To fix 2 issues:
@@ -39,27 +48,72 @@ FIELD_LABELS = {
     "startDate": "Start Date"
 }
 
+@st.cache_resource(show_spinner="Loading layout model...")
+def warm_up_layout_model():
+    # Runs once per server process; the model itself is shared by all sessions
+    from scripts.layout_detector import layout_model
+    return layout_model.warm_up(IMAGE_SIZE)
+
+def reset_editor_state():
+    """Rebuild the per-course indexes after the course list itself changed (extract, add, delete)."""
+    st.session_state.courses_rev = st.session_state.get("courses_rev", 0) + 1
+    st.session_state.date_index = StartDateIndex(st.session_state.courses)
+    st.session_state.validation = ValidationTracker(REQUIRED_FIELDS, checks=[time_range_error])
+    st.session_state.validation.check_all(st.session_state.courses)
+
+service_url = os.environ.get("TIMETABLE_SERVICE_URL")
+
+if ExtractOptions.from_env().warm_up and not service_url:
+    warm_up_layout_model()
+
 uploaded_pdf = st.file_uploader("📤 Upload Timetable PDF", type=["pdf"])
+extract_clicked = uploaded_pdf and st.button("🧠 Extract Timetable")
+
+if extract_clicked:
+    st.session_state.tracer = None  # never show (or extend) the previous extraction's trace
+
+if extract_clicked and service_url:
+    # Shared warm backend (extraction_service.py) instead of extracting in this session;
+    # its stage timings are in the service's job status, not in this session
+    with st.spinner("Extracting timetable from PDF..."):
+        try:
+            from scripts.utils.service_client import extract_via_service
+            extracted = extract_via_service(service_url, uploaded_pdf.getvalue(), uploaded_pdf.name)
+
+            for c in extracted:
+                c["id"] = str(uuid.uuid4())
+            st.session_state.courses = extracted
+            reset_editor_state()
+
+        except Exception as e:
+            log_error(e)
 
-if uploaded_pdf and st.button("🧠 Extract Timetable"):
+elif extract_clicked:
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
         tmp.write(uploaded_pdf.read())
         tmp_path = tmp.name
 
     with st.spinner("Extracting timetable from PDF..."):
         try:
-            from scripts.extract_timetable import extract_timetable
-            extracted = extract_timetable(tmp_path)
+            from scripts.extract_timetable import extract_timetable_cached
+            options = ExtractOptions.from_env()
+            with tracing.trace(options.trace or options.low_memory, memory=options.low_memory) as tracer:
+                extracted = extract_timetable_cached(tmp_path, options)
+            st.session_state.tracer = tracer  # ICS export below adds its span to the same trace
             
             for c in extracted:
                 c["id"] = str(uuid.uuid4())
             st.session_state.courses = extracted
+            reset_editor_state()
 
         except Exception as e:
             log_error(e)
+        finally:
+            os.remove(tmp_path)  # the upload is cached by content hash, not by this file
 
 if "courses" not in st.session_state:
     st.session_state.courses = []
+    reset_editor_state()
 
 if st.button("➕ Add New Course"):
     st.session_state.courses.append({
@@ -73,23 +127,43 @@ if st.button("➕ Add New Course"):
         "startDate": "",
         "note": ""
     })
+    reset_editor_state()
 
-invalid_count = sum(
-    any(not c.get(f) for f in REQUIRED_FIELDS)
-    for c in st.session_state.courses
-)
-if invalid_count > 0:
-    st.error(f"⚠️ {invalid_count} course block(s) are missing required fields. Please review them before downloading.")
-
-updated_courses = []
 st.markdown("### ✏️ Review and Edit Each Course Block")
+mode_col, size_col, page_col = st.columns([2, 1, 1])
+editor_mode = mode_col.radio("Editor", ["Cards", "Table"], horizontal=True, key="editor_mode",
+                             help="Cards edit one course at a time; Table shows every course in one grid.")
+if st.session_state.get("last_editor_mode") != editor_mode:
+    # Each mode edits st.session_state.courses; rebuild the other mode's view from it
+    st.session_state.last_editor_mode = editor_mode
+    reset_editor_state()
 
-for idx, course in enumerate(st.session_state.courses):
-    with st.expander(f"Course {idx+1}: {course.get('courseCode', '') or 'New Entry'}", expanded=True):
-        missing_fields = [f for f in REQUIRED_FIELDS if not course.get(f)]
-        if missing_fields:
-            readable = [FIELD_LABELS[f] for f in missing_fields]
-            st.warning(f"⚠️ Missing required fields: {', '.join(readable)}")
+# Placeholder, so the editor fragments can redraw the banner after re-checking a course
+invalid_banner = st.empty()
+
+
+def show_invalid_banner(force=False):
+    """Draw the invalid-course banner, or only when the count changed since it was last drawn."""
+    invalid_count = st.session_state.validation.invalid_count
+    if not force and st.session_state.get("banner_count") == invalid_count:
+        return
+    st.session_state.banner_count = invalid_count
+    if invalid_count > 0:
+        invalid_banner.error(f"⚠️ {invalid_count} course block(s) have missing required fields or an invalid time. "
+                             "Please review them before downloading.")
+    else:
+        invalid_banner.empty()
+
+
+show_invalid_banner(force=True)
+
+
+@st.fragment
+def course_card(course, number):
+    """One course block. Editing it reruns only this fragment, not the whole editor."""
+    date_index, validation = st.session_state.date_index, st.session_state.validation
+    with st.expander(f"Course {number}: {course.get('courseCode', '') or 'New Entry'}", expanded=True):
+        missing_box = st.empty()
 
         cols = st.columns([1, 1, 1, 1])
         course["courseCode"] = cols[0].text_input("Course Code *", course["courseCode"], key=f"code_{course['id']}")
@@ -106,7 +180,8 @@ for idx, course in enumerate(st.session_state.courses):
 
         # Inferred + formatted date input
         c1, c2 = st.columns([1, 3])
-        course = render_date_input(c1, course, st.session_state.courses)
+        course = render_date_input(c1, course, st.session_state.courses, date_index)
+        date_index.update(course)
         c2.markdown("""
                     🛈 Should be the **first occurance** date for the course
                     
@@ -115,33 +190,161 @@ for idx, course in enumerate(st.session_state.courses):
 
         course["note"] = st.text_area("Note (optional)", course["note"], key=f"note_{course['id']}")
 
-        delete_btn_name = f"❌ Delete Course {course['courseCode']} ({course['group']})" if (course['courseCode'] != "" and course['group'] != "") else f"❌ Delete New Course {idx+1}"
+        missing_fields = validation.check(course)
+        if missing_fields:
+            readable = [FIELD_LABELS[f] for f in missing_fields]
+            missing_box.warning(f"⚠️ Missing required fields: {', '.join(readable)}")
+        show_invalid_banner()
+
+        delete_btn_name = f"❌ Delete Course {course['courseCode']} ({course['group']})" if (course['courseCode'] != "" and course['group'] != "") else f"❌ Delete New Course {number}"
         if st.button(delete_btn_name, key=f"delete_{course['id']}"):
+            st.session_state.courses = [c for c in st.session_state.courses if c["id"] != course["id"]]
+            reset_editor_state()
+            st.rerun()
+
+
+@st.fragment
+def course_table():
+    """Every course in one st.data_editor. Edits rerun only this fragment and only touched rows are re-read."""
+    rev = st.session_state.courses_rev
+    if st.session_state.get("table_rev") != rev:
+        st.session_state.table_rev = rev
+        st.session_state.table_courses = list(st.session_state.courses)
+        st.session_state.table_base = pd.DataFrame([course_to_row(c) for c in st.session_state.courses],
+                                                   columns=TABLE_COLUMNS)
+        st.session_state.table_new_ids = []
+
+    key = f"course_table_{rev}"
+    edited = st.data_editor(
+        st.session_state.table_base,
+        key=key,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "id": None,
+            "courseCode": st.column_config.TextColumn("Course Code *"),
+            "group": st.column_config.TextColumn("Group *"),
+            "location": st.column_config.TextColumn("Location *"),
+            "day": st.column_config.SelectboxColumn("Day *", options=DAYS),
+            "weeks": st.column_config.TextColumn("Weeks *", help="Comma-separated, e.g. 1, 2, Recess, 8"),
+            "start": st.column_config.TimeColumn("Start *", format="HH:mm", step=1800),
+            "end": st.column_config.TimeColumn("End *", format="HH:mm", step=1800),
+            "startDate": st.column_config.DateColumn("Start Date *", format="DD/MM/YYYY"),
+            "note": st.column_config.TextColumn("Note"),
+        },
+    )
+
+    validation = st.session_state.validation
+    changes = st.session_state[key]
+    edited_rows = {int(pos) for pos in changes["edited_rows"]}
+    deleted_rows = {int(pos) for pos in changes["deleted_rows"]}
+
+    courses = []
+    for pos, course in enumerate(st.session_state.table_courses):
+        if pos in deleted_rows:
+            validation.discard(course["id"])
             continue
+        if pos in edited_rows:
+            course = row_to_course(edited.loc[pos], course["id"])
+            validation.check(course)
+        courses.append(course)
+
+    # Rows added in the editor come after the kept rows; give each a stable id across reruns
+    added = edited.iloc[len(courses):]
+    new_ids = st.session_state.table_new_ids
+    while len(new_ids) < len(added):
+        new_ids.append(str(uuid.uuid4()))
+    for course_id, (_, row) in zip(new_ids, added.iterrows()):
+        course = row_to_course(row, course_id)
+        validation.check(course)
+        courses.append(course)
+    for stale_id in new_ids[len(added):]:
+        validation.discard(stale_id)
+    st.session_state.courses = courses
+    show_invalid_banner()
+
+    issues = [(i, c) for i, c in enumerate(courses, 1)
+              if c["id"] in validation.missing or c["id"] in validation.errors]
+    for i, c in issues[:20]:
+        problems = [f"missing {FIELD_LABELS[f]}" for f in validation.missing.get(c["id"], [])]
+        problems += validation.errors.get(c["id"], [])
+        red_alert(f"Row {i} ({c['courseCode'] or 'new'}): {'; '.join(problems)}")
+    if len(issues) > 20:
+        st.caption(f"... and {len(issues) - 20} more rows with issues")
 
-        updated_courses.append(course)
+    undated = [c for c in courses if parse_start_date(c["startDate"]) is None and not isinstance(c["startDate"], date)]
+    if undated and st.button(f"🗓 Fill {len(undated)} missing start date(s) from other blocks"):
+        date_index = StartDateIndex(courses)
+        for course in undated:
+            inferred_date, _ = get_inferred_start_date(course, courses, date_index)
+            if inferred_date:
+                course["startDate"] = inferred_date
+                date_index.update(course)
+        reset_editor_state()
+        st.rerun()
 
-st.session_state.courses = updated_courses
+
+if editor_mode == "Table":
+    course_table()
+else:
+    courses = st.session_state.courses
+    page_size = size_col.selectbox("Per page", [10, 25, 50, 100], key="editor_page_size")
+    n_pages = max(1, math.ceil(len(courses) / page_size))
+    if st.session_state.get("editor_page", 1) > n_pages:
+        st.session_state.editor_page = n_pages
+    page = page_col.number_input("Page", min_value=1, max_value=n_pages, step=1, key="editor_page")
+    first = (page - 1) * page_size
+    for idx in range(first, min(first + page_size, len(courses))):
+        course_card(courses[idx], idx + 1)
 
 # === ICS Export ===
 if st.button("📥 Convert to ICS"):
-    cal, errors = generate_ics_from_courses(st.session_state.courses)
+    with tracing.activate(st.session_state.get("tracer")):
+        ics_bytes, errors = generate_ics_bytes(st.session_state.courses)
 
     if errors:
         for err in errors:
             st.error(err)
     else:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".ics", mode="w", encoding="utf-8") as f:
-            f.writelines(cal)
-            f.flush()
-            tmp_path = f.name
-
-        with open(tmp_path, "rb") as f:
-            st.download_button("⬇️ Download ICS File", f, file_name="timetable.ics", mime="text/calendar")
+        # Served from memory; nothing is written to disk
+        st.download_button("⬇️ Download ICS File", ics_bytes, file_name="timetable.ics", mime="text/calendar")
 
 with st.expander("🛠 Developer Debug Info", expanded=False):
     st.caption("This section helps debug upload and extraction issues.")
     st.text(f"PDF uploaded: {uploaded_pdf.name if uploaded_pdf else 'None'}")
     st.text(f"YOLOv8 model version: {yolo_version}")
+    from scripts.layout_detector import layout_model
+    model_stats = layout_model.stats()
+    if model_stats["loaded"]:
+        st.text(f"Layout model load: {model_stats['load_seconds']:.2f}s"
+                + (f", warm-up: {model_stats['warmup_seconds']:.2f}s" if model_stats["warmup_seconds"] is not None else ""))
+    else:
+        st.text("Layout model: not loaded yet")
+    from scripts.utils.layout_cache import get_layout_cache
+    cache_stats = get_layout_cache().stats()
+    # Counts lookups made in this process (pool workers keep their own)
+    st.text(f"Layout cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), "
+            f"{cache_stats['entries']} format(s) stored ({cache_stats['path'] or 'in memory'})")
     st.text(f"Streamlit version: {st.__version__}")
+
+    tracer = st.session_state.get("tracer")
+    if tracer is not None:
+        st.markdown("**⏱ Extraction trace**")
+        st.dataframe(pd.DataFrame([
+            {"stage": name, "calls": s["calls"], "total ms": round(s["seconds"] * 1000, 1),
+             "mean ms": round(s["mean_ms"], 2), "max ms": round(s["max_ms"], 2),
+             **({"peak MB": s["peak_mb"], "+MB": s.get("delta_mb")} if "peak_mb" in s else {})}
+            for name, s in tracer.summary().items()
+        ]), hide_index=True)
+        if tracer.counters:
+            st.text(", ".join(f"{name}: {n}" for name, n in sorted(tracer.counters.items())))
+        json_col, chrome_col = st.columns(2)
+        json_col.download_button("⬇️ Trace (JSON)", json.dumps(tracer.to_dict(), default=str),
+                                  file_name="trace.json", mime="application/json")
+        chrome_col.download_button("⬇️ Chrome trace", json.dumps(tracer.to_chrome_trace(), default=str),
+                                   file_name="trace.chrome.json", mime="application/json",
+                                   help="Open in chrome://tracing or ui.perfetto.dev")
+    else:
+        st.text("Extraction trace: off (set TIMETABLE_TRACE=1 for stage timings, or TIMETABLE_LOW_MEMORY=1 for timings and peak memory)")
     st.write("Extracted at:", timezone_converter(datetime.now(), "Asia/Singapore").strftime('%d %b %y %H:%M:%S'))
\ No newline at end of file
@@ -0,0 +1,45 @@
+# Export the trained layout model for CPU inference.
+#
+#   python yolov8/export_model.py --format onnx
+#   python yolov8/export_model.py --format openvino
+#   python yolov8/export_model.py --format openvino --int8 --data dataset/data.yaml
+#
+# Outputs land next to best.pt and are picked up by TIMETABLE_LAYOUT_BACKEND
+# (see LAYOUT_BACKENDS in scripts/layout_detector.py).
+
+import os
+import argparse
+from ultralytics import YOLO
+
+WEIGHTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs/detect/train_3_class/weights/best.pt")
+
+parser = argparse.ArgumentParser(description="Export the timetable layout model")
+parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+parser.add_argument("--imgsz", type=int, default=1280)          # 📐 same as training
+parser.add_argument("--int8", action="store_true")              # 🧮 OpenVINO only, needs --data for calibration
+parser.add_argument("--data", default=None)                     # dataset yaml used for INT8 calibration
+parser.add_argument("--static", action="store_true")            # 🔒 fixed batch/shape: slightly faster, but batch size must match
+parser.add_argument("--batch", type=int, default=1)             # batch size baked in with --static
+args = parser.parse_args()
+
+if args.int8 and args.format != "openvino":
+    parser.error("--int8 is only supported for --format openvino")
+if args.int8 and not args.data:
+    parser.error("--int8 needs --data for calibration images")
+
+model = YOLO(WEIGHTS)
+
+try:
+    path = model.export(
+        format=args.format,
+        imgsz=args.imgsz,
+        int8=args.int8,
+        data=args.data,
+        dynamic=not args.static, # 📦 dynamic batch so single and batched pages both work
+        batch=args.batch,
+        simplify=True,
+    )
+    print(f"\n✅ Exported to {path}")
+except Exception as e:
+    print("\n❌ Export failed with error:")
+    print(e)